@@ -0,0 +1,311 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import platform
+import random
+import struct
+import sys
+import tarfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from file_loader import FileProcessor, read_header
+
+logger = logging.getLogger(__name__)
+
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike "
+         "november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _text(rng: random.Random, size: int) -> str:
+    lines = []
+    total = 0
+    while total < size:
+        line = _sentence(rng)
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _nested(rng: random.Random, depth: int, breadth: int) -> Any:
+    if depth == 0:
+        return rng.choice([rng.randint(0, 10**6), rng.random(), _sentence(rng, 4), True, None])
+    return {f"{rng.choice(WORDS)}_{i}": _nested(rng, depth - 1, breadth) for i in range(breadth)}
+
+
+def _xml(rng: random.Random, records: int) -> str:
+    parts = ['<?xml version="1.0" encoding="utf-8"?>', "<export>"]
+    for i in range(records):
+        parts.append(f'<record id="{i}"><name>{rng.choice(WORDS)}</name>'
+                     f'<value>{rng.random():.6f}</value><note>{_sentence(rng, 6)}</note></record>')
+    parts.append("</export>")
+    return "\n".join(parts)
+
+
+def _html(rng: random.Random, paragraphs: int) -> str:
+    parts = ["<!DOCTYPE html>", f"<html><head><title>{_sentence(rng, 5)}</title>",
+             "<style>body { font-family: sans-serif; }</style>",
+             "<script>var tracked = [];</script></head><body>"]
+    for i in range(paragraphs):
+        parts.append(f'<h2>{rng.choice(WORDS).capitalize()} {i}</h2><p>{_sentence(rng)} '
+                     f'<a href="https://example.com/{rng.choice(WORDS)}/{i}">{rng.choice(WORDS)}</a> '
+                     f"{_sentence(rng)}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _pdf(rng: random.Random, pages: int) -> bytes:
+    """Build a minimal multi-page PDF with one line of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = f"Page {page + 1}: {_sentence(rng)}".replace("(", "").replace(")", "")
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _png(rng: random.Random, width: int, height: int) -> bytes:
+    """Encode an RGB noise-and-gradient image as PNG using only zlib."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)
+        for x in range(width):
+            rows.extend(((x * 255) // width, (y * 255) // height, rng.randrange(256)))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(bytes(rows), 6)) + chunk(b"IEND", b""))
+
+
+def generate_corpus(root: Path, seed: int = 0, text_kb: int = 64, csv_rows: int = 10000, csv_cols: int = 8,
+                    json_depth: int = 4, xml_records: int = 2000, pdf_pages: int = 20, images: int = 4,
+                    image_size: int = 256, html_paragraphs: int = 500, jsonl_records: int = 5000,
+                    copies: int = 4) -> List[Path]:
+    """Write a deterministic mixed corpus under ``root`` and return the generated files.
+
+    Formats that need optional packages (JPEG via Pillow, XLSX via openpyxl)
+    are skipped with a warning when those packages are missing.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    files: List[Path] = []
+
+    def write(name: str, data: Any) -> Path:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, str):
+            path.write_text(data, encoding="utf-8")
+        else:
+            path.write_bytes(data)
+        files.append(path)
+        return path
+
+    for i in range(copies):
+        write(f"text/notes_{i}.txt", _text(rng, text_kb * 1024))
+        write(f"text/app_{i}.log", _text(rng, text_kb * 1024))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow([f"col_{c}" for c in range(csv_cols)])
+        for r in range(csv_rows):
+            writer.writerow([r if c % 3 == 0 else f"{rng.random():.5f}" if c % 3 == 1 else rng.choice(WORDS)
+                             for c in range(csv_cols)])
+        write(f"tables/table_{i}.csv", buffer.getvalue())
+
+        write(f"data/nested_{i}.json", json.dumps(_nested(rng, json_depth, 4)))
+        write(f"data/events_{i}.jsonl", "".join(json.dumps(_nested(rng, 2, 4)) + "\n" for _ in range(jsonl_records)))
+        write(f"web/page_{i}.html", _html(rng, html_paragraphs))
+        write(f"data/export_{i}.xml", _xml(rng, xml_records))
+        write(f"docs/manual_{i}.pdf", _pdf(rng, pdf_pages))
+
+    for i in range(images):
+        write(f"images/img_{i}.png", _png(rng, image_size, image_size))
+    try:
+        from PIL import Image
+        for i in range(images):
+            img = Image.frombytes("RGB", (image_size, image_size), rng.randbytes(image_size * image_size * 3))
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=85)
+            write(f"images/photo_{i}.jpg", buffer.getvalue())
+    except ImportError:
+        logger.warning("Pillow not installed; skipping JPEG files")
+
+    try:
+        import openpyxl
+        for i in range(copies):
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet("data")
+            for r in range(csv_rows // 10):
+                sheet.append([r, rng.random(), rng.choice(WORDS)])
+            path = root / f"tables/book_{i}.xlsx"
+            workbook.save(path)
+            files.append(path)
+    except ImportError:
+        logger.warning("openpyxl not installed; skipping XLSX files")
+
+    members = [path for path in files if path.suffix in (".txt", ".csv", ".json", ".pdf")][:8]
+    # Fixed timestamps keep the archives byte-identical between runs.
+    archive = root / "archives/mixed.zip"
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for path in members:
+            zip_ref.writestr(zipfile.ZipInfo(path.relative_to(root).as_posix(), date_time=(2020, 1, 1, 0, 0, 0)),
+                             path.read_bytes(), zipfile.ZIP_DEFLATED)
+    files.append(archive)
+    archive = root / "archives/mixed.tar.gz"
+    with gzip.GzipFile(archive, "wb", mtime=0) as gz_ref, tarfile.open(fileobj=gz_ref, mode="w") as tar_ref:
+        for path in members:
+            data = path.read_bytes()
+            info = tarfile.TarInfo(path.relative_to(root).as_posix())
+            info.size = len(data)
+            tar_ref.addfile(info, io.BytesIO(data))
+    files.append(archive)
+    return files
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered), "p50_ms": pick(0.50) * 1000, "p90_ms": pick(0.90) * 1000,
+            "p99_ms": pick(0.99) * 1000, "max_ms": ordered[-1] * 1000}
+
+
+def _peak_rss_mb() -> Dict[str, Optional[float]]:
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None}
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale}
+
+
+def bench_handlers(processor: FileProcessor, files: List[Path], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Time each file's handler directly, ``repeat`` times, grouped by handler class.
+
+    Runs that raise or return an error record are counted under ``errors``
+    and left out of the percentiles, so a handler that fails fast (e.g. a
+    missing optional package) does not look fast.
+    """
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for path in files:
+        header = read_header(path)
+        handler = processor.resolve_handler(path, header)
+        if handler is None or header is None:
+            continue
+        name = type(handler).__name__
+        latencies.setdefault(name, [])
+        errors.setdefault(name, 0)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                failed = "error" in handler.extract_sniffed(path, header)
+            except Exception as e:
+                logger.warning(f"{name} raised on {path}: {e}")
+                failed = True
+            if failed:
+                errors[name] += 1
+            else:
+                latencies[name].append(time.perf_counter() - start)
+    return {name: {**_percentiles(samples), "errors": errors[name]} for name, samples in sorted(latencies.items())}
+
+
+def bench_directory(processor: FileProcessor, root: Path, workers: int = 1, executor: str = "auto") -> Dict[str, Any]:
+    total_bytes = sum(path.stat().st_size for path in root.rglob("*") if path.is_file())
+    start = time.perf_counter()
+    count = 0
+    for _ in processor.iter_directory(root, recursive=True, workers=workers, executor=executor):
+        count += 1
+    elapsed = time.perf_counter() - start
+    return {"workers": workers, "executor": executor, "files": count, "bytes": total_bytes,
+            "seconds": elapsed, "files_per_s": count / elapsed, "mb_per_s": total_bytes / elapsed / 1e6}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"{'run':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for old, new in zip(baseline["directory"], current["directory"]):
+        name = f"dir {new['executor']} x{new['workers']}"
+        print(f"{name:<24}{old['files_per_s']:>10.1f}/s{new['files_per_s']:>10.1f}/s"
+              f"{(new['files_per_s'] / old['files_per_s'] - 1) * 100:>+9.1f}%")
+    for name, new in current["handlers"].items():
+        old = baseline["handlers"].get(name)
+        if old and old.get("count") and new.get("count"):
+            print(f"{name + ' p50':<24}{old['p50_ms']:>10.2f}ms{new['p50_ms']:>10.2f}ms"
+                  f"{(new['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0:>+9.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark file_loader handlers against a synthetic corpus.")
+    parser.add_argument("--corpus", type=str, default="./bench_corpus", help="Directory for the generated corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the corpus")
+    parser.add_argument("--copies", type=int, default=4, help="Number of files generated per format")
+    parser.add_argument("--csv-rows", type=int, default=10000, help="Rows per CSV file")
+    parser.add_argument("--csv-cols", type=int, default=8, help="Columns per CSV file")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages per PDF file")
+    parser.add_argument("--text-kb", type=int, default=64, help="Size of each text and log file")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per file for handler latencies")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Worker counts to benchmark")
+    parser.add_argument("--results", type=str, default="bench_results.json", help="Where to save the results")
+    parser.add_argument("--compare", type=str, help="Earlier results file to compare against")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    root = Path(args.corpus)
+    files = generate_corpus(root, seed=args.seed, text_kb=args.text_kb, csv_rows=args.csv_rows,
+                            csv_cols=args.csv_cols, pdf_pages=args.pdf_pages, copies=args.copies)
+    processor = FileProcessor()
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"files": len(files), "seed": args.seed, "copies": args.copies, "csv_rows": args.csv_rows,
+                   "pdf_pages": args.pdf_pages},
+        "handlers": bench_handlers(processor, files, repeat=args.repeat),
+        "directory": [bench_directory(processor, root, workers=workers) for workers in args.workers],
+    }
+    results["peak_rss_mb"] = _peak_rss_mb()
+
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,87 @@
 from docx import Document
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
+import argparse
 import os
-from textblob import TextBlob
 import re
 
-input_dir = 
-output_dir = 
-
-def clean_and_save_docx(input_dir, output_dir):
-    for filename in os.listdir(input_dir):
-        if filename.endswith('.docx'):
-            input_path = os.path.join(input_dir, filename)
-            output_path = os.path.join(output_dir, 'cleaned_' + filename)
-            
-            # Load the .docx file
-            document = Document(input_path)
-
-            # Create a new Document
-            new_document = Document()
-
-            # Iterate over the paragraphs in the document
-            for paragraph in document.paragraphs: 
-                text = paragraph.text
-
-                # Clean the text as before...
-                text = re.sub(r'[^\w\s]', '', text)
-                text = re.sub(r'http\S+|www\S+', '', text)
-                text = str(TextBlob(text).correct())
-                soup = BeautifulSoup(text, 'html.parser')
-                text = soup.get_text()
-                text = '  '.join(text.split())
-
-                # Add the cleaned text to the new document
-                new_document.add_paragraph(text)
-
-            # Iterate over the tables in the document
-            for table in document.tables:
-                # Create a new table in the new document
-                new_table = new_document.add_table(rows=0, cols=len(table.columns))
-
-                # Iterate over the rows in the table
-                for row in table.rows:
-                    cells = row.cells
-
-                    # Add a new row to the new table
-                    new_cells = new_table.add_row().cells
-
-                    # Iterate over the cells in the row
-                    for i, cell in enumerate(cells):
-                        # Copy the text from the old cell to the new cell
-                        new_cells[i].text = cell.text
-
-            # Save the new document
-            new_document.save(output_path)
-
-clean_and_save_docx(input_dir, output_dir)
\ No newline at end of file
+from file_loader import strip_html
+
+# Compiled once per process. URLs are removed before punctuation, which
+# would otherwise break them up so they never match.
+URL_PATTERN = re.compile(r'http\S+|www\S+')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+
+@lru_cache(maxsize=None)
+def correct_word(word: str) -> str:
+    """Spell-correct one word. Memoised, so each distinct word is corrected once per process."""
+    from textblob import Word
+    return str(Word(word).correct())
+
+
+def clean_text(text: str, spell_check: bool = False) -> str:
+    if '<' in text:
+        text = strip_html(text)
+    text = URL_PATTERN.sub('', text)
+    text = PUNCTUATION_PATTERN.sub('', text)
+    words = text.split()
+    if spell_check:
+        words = [correct_word(word) if word.isalpha() else word for word in words]
+    return '  '.join(words)
+
+
+def clean_docx(input_path: str, output_path: str, spell_check: bool = False) -> str:
+    # Load the .docx file
+    document = Document(input_path)
+
+    # Create a new Document
+    new_document = Document()
+
+    for paragraph in document.paragraphs:
+        new_document.add_paragraph(clean_text(paragraph.text, spell_check))
+
+    # Tables are copied as they are
+    for table in document.tables:
+        new_table = new_document.add_table(rows=0, cols=len(table.columns))
+        for row in table.rows:
+            new_cells = new_table.add_row().cells
+            for i, cell in enumerate(row.cells):
+                new_cells[i].text = cell.text
+
+    new_document.save(output_path)
+    return output_path
+
+
+def clean_and_save_docx(input_dir: str, output_dir: str, spell_check: bool = False,
+                        workers: Optional[int] = None) -> List[str]:
+    """Clean every .docx in input_dir into output_dir as cleaned_<name>, one file per worker process.
+
+    Spelling correction is off by default; with it on, each worker keeps its
+    own word cache for all the documents it handles.
+    """
+    filenames = sorted(filename for filename in os.listdir(input_dir) if filename.endswith('.docx'))
+    input_paths = [os.path.join(input_dir, filename) for filename in filenames]
+    output_paths = [os.path.join(output_dir, 'cleaned_' + filename) for filename in filenames]
+    if workers == 1 or len(filenames) < 2:
+        return [clean_docx(input_path, output_path, spell_check)
+                for input_path, output_path in zip(input_paths, output_paths)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Larger chunks keep each worker's spelling cache warm across documents.
+        chunksize = max(1, len(filenames) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(clean_docx, input_paths, output_paths, [spell_check] * len(filenames),
+                             chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the text of every .docx file in a directory")
+    parser.add_argument("input_dir", help="Directory containing .docx files")
+    parser.add_argument("output_dir", help="Directory for the cleaned copies")
+    parser.add_argument("--spell-check", action="store_true", help="Spell-correct words with TextBlob (slow)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for output_path in clean_and_save_docx(args.input_dir, args.output_dir, args.spell_check, args.workers):
+        print(output_path)
@@ -1,31 +1,149 @@
-from pdf2docx import parse
-from typing import Tuple
+from pdf2docx import Converter
+import fitz  # PyMuPDF, installed with pdf2docx
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import json
 import os
+import sys
+import time
 
-path = 
-def convert_pdf2docx(pages: Tuple = None):
-    """Converts PDF to DOCX"""
+# PDFs with at least this many pages are converted one at a time with
+# pdf2docx's own multi-processing, which shards their pages across all cores.
+SHARD_MIN_PAGES = 200
+
+
+def find_pdfs(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (input PDF, output DOCX) pairs under path, in a stable order."""
     for root, dirs, files in os.walk(path):
-        # Iterate through each file in the current directory
-        for file in files:
-            # Check if the file has a .pdf extension
-            if file.endswith('.pdf'):
-                # Construct the full file path
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith('.pdf'):
                 input_file = os.path.join(root, file)
-                # Construct the output file path
-                output_file = os.path.splitext(input_file)[0] + '.docx'
-                if pages:
-                    pages = [int(i) for i in list(pages) if i.isnumeric()]
-                result = parse(pdf_file=input_file, docx_with_path=output_file, pages=pages)
-                summary = {
-                    "File": input_file,
-                    "Pages": str(pages),
-                    "Output File": output_file
-                }
-                # Printing Summary
-                print("## Summary ########################################################")
-                print("\n".join("{}:{}".format(i, j) for i, j in summary.items()))
-                print("###################################################################")
+                yield input_file, os.path.splitext(input_file)[0] + '.docx'
+
+
+def is_up_to_date(input_file: str, output_file: str) -> bool:
+    try:
+        return os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+    except OSError:
+        return False
+
+
+def convert_file(input_file: str, output_file: str, pages: Optional[List[int]] = None,
+                 workers: int = 1) -> Dict[str, Any]:
+    """Convert one PDF and return its summary entry; failures are reported, not raised.
+
+    The DOCX is written under a temporary name and renamed when complete, so an
+    interrupted conversion is never mistaken for an up-to-date output.
+    """
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"file": input_file, "output": output_file, "pages": None}
+    partial_file = output_file + '.part'
+    try:
+        converter = Converter(input_file)
+        try:
+            result["pages"] = len(pages) if pages else len(converter.fitz_doc)
+            if workers > 1:
+                converter.convert(partial_file, multi_processing=True, cpu_count=workers)
+            else:
+                converter.convert(partial_file, pages=pages)
+        finally:
+            converter.close()
+        os.replace(partial_file, output_file)
+        result["status"] = "converted"
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def count_pages(input_file: str) -> int:
+    try:
+        with fitz.open(input_file) as document:
+            return document.page_count
+    except Exception:
+        # Let the conversion itself report the broken file.
+        return 0
+
+
+def convert_pdf2docx(path: str, pages: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                     shard_min_pages: int = SHARD_MIN_PAGES, force: bool = False) -> Dict[str, Any]:
+    """Converts every PDF under path to DOCX and returns a summary of the run.
+
+    Small PDFs are spread across a process pool; large ones are converted one
+    at a time with their pages sharded across the same number of processes.
+    Outputs newer than their PDF are skipped unless force is set. pages holds
+    zero-based page indices, as pdf2docx expects.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    page_filter = [int(i) for i in pages if str(i).isnumeric()] if pages else None
+    results: List[Dict[str, Any]] = []
+    small: List[Tuple[str, str]] = []
+    large: List[Tuple[str, str]] = []
+    for input_file, output_file in find_pdfs(path):
+        if not force and is_up_to_date(input_file, output_file):
+            results.append({"file": input_file, "output": output_file, "status": "skipped"})
+            continue
+        # pdf2docx can only shard a continuous page range, not a page list.
+        if page_filter is None and workers > 1 and count_pages(input_file) >= shard_min_pages:
+            large.append((input_file, output_file))
+        else:
+            small.append((input_file, output_file))
+
+    if workers > 1 and len(small) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_file, input_file, output_file, page_filter)
+                       for input_file, output_file in small]
+            for future in as_completed(futures):
+                results.append(_report(future.result()))
+    else:
+        for input_file, output_file in small:
+            results.append(_report(convert_file(input_file, output_file, page_filter)))
+    for input_file, output_file in large:
+        results.append(_report(convert_file(input_file, output_file, workers=workers)))
+
+    results.sort(key=lambda result: result["file"])
+    statuses = [result["status"] for result in results]
+    return {
+        "files": results,
+        "converted": statuses.count("converted"),
+        "skipped": statuses.count("skipped"),
+        "failed": statuses.count("failed"),
+        "pages": sum(result.get("pages") or 0 for result in results if result["status"] == "converted"),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _report(result: Dict[str, Any]) -> Dict[str, Any]:
+    detail = result.get("error") or f"{result['pages']} pages in {result['seconds']}s"
+    print(f"{result['status']}: {result['file']} ({detail})", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert every PDF under a directory to DOCX")
+    parser.add_argument("path", help="Directory to search for PDF files")
+    parser.add_argument("--pages", nargs="+", help="Zero-based page indices to convert from each PDF")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--shard-min-pages", type=int, default=SHARD_MIN_PAGES,
+                        help="Split the pages of PDFs at least this long across all workers")
+    parser.add_argument("--force", action="store_true", help="Convert even when the DOCX is up to date")
+    parser.add_argument("--summary", help="Write the JSON summary to this file instead of stdout")
+    args = parser.parse_args()
+
+    summary = convert_pdf2docx(args.path, pages=args.pages, workers=args.workers,
+                               shard_min_pages=args.shard_min_pages, force=args.force)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as output:
+            json.dump(summary, output, indent=2)
+    else:
+        print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["failed"] else 0)
+
 
 if __name__ == "__main__":
-    convert_pdf2docx()
\ No newline at end of file
+    main()
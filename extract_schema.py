@@ -1,61 +1,255 @@
+"""Infer the schema of JSON and NDJSON files without loading them whole.
+
+Schemas are rendered as JSON:
+- scalars are type names ("str", "int", "float", "bool", "NoneType")
+- objects are dicts; a key ending in "?" is missing from some records
+- arrays are a one-element list holding the item schema, [] when always empty
+- unions of scalars are "int | NoneType"; unions involving objects or arrays
+  are {"anyOf": [...]}
+"""
+import argparse
 import json
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+# Schema nodes are tuples whose children are node ids, interned once per
+# SchemaInferrer, so equal schemas share an id and hashing a node never walks
+# its subtree:
+#   ("scalar", type_name)
+#   ("array", item_id)                    item_id is EMPTY for empty arrays
+#   ("object", ((key, node_id, required), ...))    sorted by key
+#   ("union", (node_id, ...))             sorted, no nested unions
+EMPTY = -1
 
-def extract_schema(json_file):
-    with open(json_file, 'r') as f:
-        data = json.load(f)
-    schema = {}
-    for key, value in data.items():
-        if isinstance(value, dict):
-            schema[key] = extract_schema_from_dict(value)
-        elif isinstance(value, list):
-            schema[key] = extract_schema_from_list(value)
-        else:
-            schema[key] = type(value).__name__
-    return schema
 
-seen_schemas = {}
+class SchemaInferrer:
+    def __init__(self, stream_depth: int = 2, chunk_size: int = 1024 * 1024):
+        # The top-level value and arrays nested less than stream_depth deep
+        # are read element by element, so both [...] and {"data": [...]}
+        # dumps stream; everything else is decoded whole, which is faster.
+        self.stream_depth = stream_depth
+        self.chunk_size = chunk_size
+        self._ids: Dict[Tuple, int] = {}
+        self._nodes: List[Tuple] = []
+        self._merged: Dict[Tuple[int, int], int] = {}
+        self._scalar_ids: Dict[type, int] = {}
 
-def extract_schema_from_dict(d):
-    schema = {}
-    for key, value in d.items():
+    def _intern(self, node: Tuple) -> int:
+        node_id = self._ids.get(node)
+        if node_id is None:
+            node_id = self._ids[node] = len(self._nodes)
+            self._nodes.append(node)
+        return node_id
+
+    def infer(self, value: Any) -> int:
+        # Most nodes are scalars, so they are a single dict lookup.
+        node_id = self._scalar_ids.get(type(value))
+        if node_id is not None:
+            return node_id
         if isinstance(value, dict):
-            schema[key] = extract_schema_from_dict(value)
-        elif isinstance(value, list):
-            schema[key] = extract_schema_from_list(value)
+            fields = [(key, self.infer(item), True) for key, item in value.items()]
+            fields.sort()
+            return self._intern(("object", tuple(fields)))
+        if isinstance(value, list):
+            item_id = EMPTY
+            for item in value:
+                item_id = self.merge(item_id, self.infer(item))
+            return self._intern(("array", item_id))
+        node_id = self._scalar_ids[type(value)] = self._intern(("scalar", type(value).__name__))
+        return node_id
+
+    def merge(self, a: int, b: int) -> int:
+        """Union of two schemas; objects merge field by field, arrays by item."""
+        if a == b or b == EMPTY:
+            return a
+        if a == EMPTY:
+            return b
+        key = (a, b) if a < b else (b, a)
+        merged = self._merged.get(key)
+        if merged is None:
+            merged = self._merged[key] = self._merge(a, b)
+        return merged
+
+    def _merge(self, a: int, b: int) -> int:
+        members: Dict[Any, int] = {}
+        for node_id in self._members(a) + self._members(b):
+            kind, body = self._nodes[node_id]
+            # At most one object and one array survive in a union; scalars are kept by name.
+            slot = body if kind == "scalar" else kind
+            if slot not in members:
+                members[slot] = node_id
+            elif kind == "object":
+                members[slot] = self._merge_objects(members[slot], node_id)
+            elif kind == "array":
+                members[slot] = self._intern(("array", self.merge(self._nodes[members[slot]][1], body)))
+        if len(members) == 1:
+            return next(iter(members.values()))
+        return self._intern(("union", tuple(sorted(members.values()))))
+
+    def _members(self, node_id: int) -> List[int]:
+        kind, body = self._nodes[node_id]
+        return list(body) if kind == "union" else [node_id]
+
+    def _merge_objects(self, a: int, b: int) -> int:
+        fields_a = {key: (node_id, required) for key, node_id, required in self._nodes[a][1]}
+        fields_b = {key: (node_id, required) for key, node_id, required in self._nodes[b][1]}
+        fields = []
+        for key in sorted(fields_a.keys() | fields_b.keys()):
+            if key in fields_a and key in fields_b:
+                fields.append((key, self.merge(fields_a[key][0], fields_b[key][0]),
+                               fields_a[key][1] and fields_b[key][1]))
+            else:
+                node_id, _ = fields_a.get(key) or fields_b[key]
+                fields.append((key, node_id, False))
+        return self._intern(("object", tuple(fields)))
+
+    def infer_file(self, json_file: str, sample: Optional[int] = None) -> int:
+        """Infer the schema of a JSON document, a top-level array, or NDJSON.
+
+        With several top-level values (NDJSON) the result is the merged schema
+        of those records. ``sample`` stops after that many records: top-level
+        values, or elements of the top-level array. Nested streamed arrays keep
+        only their first ``sample`` elements too, skipping the rest.
+        """
+        with open(json_file, "r", encoding="utf-8") as file:
+            reader = _JSONReader(file, self.chunk_size)
+            if not reader.peek():
+                raise ValueError(f"{json_file} is empty")
+            schema = self._infer_stream(reader, 0, sample)
+            records = 1
+            while not reader.stopped and reader.peek() and (sample is None or records < sample):
+                schema = self.merge(schema, self._infer_stream(reader, 0, sample))
+                records += 1
+            return schema
+
+    def _infer_stream(self, reader: "_JSONReader", depth: int, sample: Optional[int]) -> int:
+        char = reader.peek()
+        if not (char == "[" and depth < self.stream_depth or char == "{" and depth == 0):
+            return self.infer(reader.decode())
+        reader.advance()
+        if char == "[":
+            item_id = EMPTY
+            count = 0
+            if reader.peek() != "]":
+                while True:
+                    if sample is None or count < sample:
+                        item_id = self.merge(item_id, self._infer_stream(reader, depth + 1, sample))
+                    elif depth == 0:
+                        # Sampled enough of the top-level array; the rest of the file is not needed.
+                        reader.stopped = True
+                        return self._intern(("array", item_id))
+                    else:
+                        reader.decode()
+                    count += 1
+                    if reader.next_char(",]") == "]":
+                        break
+            else:
+                reader.advance()
+            return self._intern(("array", item_id))
+        fields = []
+        if reader.peek() != "}":
+            while True:
+                key = reader.decode()
+                reader.next_char(":")
+                fields.append((key, self._infer_stream(reader, depth + 1, sample), True))
+                if reader.next_char(",}") == "}":
+                    break
         else:
-            schema[key] = type(value).__name__
-
-    schema_str = json.dumps(schema, sort_keys=True)
-    if schema_str in seen_schemas:
-        return seen_schemas[schema_str]
-    else:
-        seen_schemas[schema_str] = schema
-        return schema
-
-def extract_schema_from_list(lst):
-    if not lst:
-        return 'empty list'
-    if isinstance(lst[0], dict):
-        schemas = [extract_schema_from_dict(item) for item in lst]
-    elif isinstance(lst[0], list):
-        schemas = [extract_schema_from_list(item) for item in lst]
-    else:
-        return type(lst[0]).__name__
-
-    merged_schema = {}
-    for schema in schemas:
-        merged_schema.update(schema)
-    schema_str = json.dumps(merged_schema, sort_keys=True)
-    if schema_str in seen_schemas:
-        return seen_schemas[schema_str]
-    else:
-        seen_schemas[schema_str] = merged_schema
-        return merged_schema
+            reader.advance()
+        # Duplicate keys keep the last value, like json.load.
+        return self._intern(("object", tuple(sorted(dict((key, (key, node_id, required))
+                                                         for key, node_id, required in fields).values()))))
+
+    def render(self, node_id: int) -> Any:
+        if node_id == EMPTY:
+            return None
+        kind, body = self._nodes[node_id]
+        if kind == "scalar":
+            return body
+        if kind == "array":
+            return [] if body == EMPTY else [self.render(body)]
+        if kind == "object":
+            return {key if required else f"{key}?": self.render(child) for key, child, required in body}
+        rendered = [self.render(member) for member in body]
+        if all(isinstance(member, str) for member in rendered):
+            return " | ".join(rendered)
+        return {"anyOf": rendered}
+
+
+class _JSONReader:
+    """Incremental reader over a text stream, decoding one JSON value at a time."""
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        # Set once a sampled top-level array has been read far enough.
+        self.stopped = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it, or "" at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def advance(self) -> None:
+        self.pos += 1
+
+    def next_char(self, allowed: str) -> str:
+        char = self.peek()
+        if not char or char not in allowed:
+            raise ValueError(f"Expected one of {allowed!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number or literal ending exactly at the buffer end may continue in the next chunk.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            # Grow reads with the pending value so re-decoding a large value stays linear overall.
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def extract_schema(json_file: str, sample: Optional[int] = None) -> Any:
+    inferrer = SchemaInferrer()
+    return inferrer.render(inferrer.infer_file(json_file, sample))
+
+
 def main():
-    json_file = "C:/Code/dialog-skill.json"  # replace with your JSON file
-    schema = extract_schema(json_file)
-    with open('schema.txt', 'w') as f:
+    parser = argparse.ArgumentParser(description="Infer the schema of a JSON or NDJSON file")
+    parser.add_argument("json_file", help="JSON or NDJSON file to profile")
+    parser.add_argument("--output", default="schema.txt", help="Where to write the schema")
+    parser.add_argument("--sample", type=int, help="Only infer from the first N records")
+    args = parser.parse_args()
+
+    schema = extract_schema(args.json_file, sample=args.sample)
+    with open(args.output, 'w') as f:
         json.dump(schema, f, indent=4)
 
 
+if __name__ == "__main__":
     main()
@@ -1,27 +1,246 @@
 import os
+import sys
 import logging
-from typing import Dict, Any, List, Union
-from pathlib import Path
+from typing import Dict, Any, List, Union, Iterator, Optional, Tuple, Deque, IO, Callable, Container, NamedTuple, Set, AsyncIterator
+from pathlib import Path, PurePosixPath
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import json
 import xml.etree.ElementTree as ET
 import zipfile
 import tarfile
 import csv
 import io
+import array
+import itertools
+import math
+import hashlib
+import sqlite3
+import threading
+import time
+import tempfile
+import gzip
+import zlib
+import heapq
+import functools
+import asyncio
+import mmap
+import codecs
+from html.parser import HTMLParser
+import re
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+EXECUTORS = ("auto", "thread", "process")
+# Separates an archive's path from a member name in member references.
+MEMBER_SEPARATOR = "!"
+OUTPUT_FORMATS = ("json", "ndjson")
+# Files submitted ahead of the one being yielded, per worker.
+IN_FLIGHT_PER_WORKER = 4
+
+# Bytes read from the start of every file for content sniffing.
+SNIFF_BYTES = 512
+# Longest first line probed when deciding whether a .json file is JSON Lines.
+JSON_LINES_PROBE_BYTES = 1024 * 1024
+
+# (offset, signature, extension, authoritative). Authoritative signatures
+# override the file extension; the rest only fill in for unknown extensions.
+MAGIC_NUMBERS = [
+    (0, b"%PDF-", ".pdf", True),
+    (0, b"\x89PNG\r\n\x1a\n", ".png", True),
+    (0, b"\xff\xd8\xff", ".jpg", True),
+    (0, b"GIF87a", ".gif", True),
+    (0, b"GIF89a", ".gif", True),
+    (0, b"\x1f\x8b", ".gz", True),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".xls", False),
+    (257, b"ustar", ".tar", True),
+    (0, b"PK\x03\x04", ".zip", False),
+    (0, b"PK\x05\x06", ".zip", False),
+]
+
+# Signatures at offset 0 indexed by first byte, so sniffing is one dict lookup
+# plus a couple of startswith checks.
+_MAGIC_INDEX: Dict[int, List[Tuple[bytes, str, bool]]] = {}
+for _offset, _signature, _extension, _authoritative in MAGIC_NUMBERS:
+    if _offset == 0:
+        _MAGIC_INDEX.setdefault(_signature[0], []).append((_signature, _extension, _authoritative))
+_MAGIC_AT_OFFSET = [entry for entry in MAGIC_NUMBERS if entry[0] != 0]
+# OLE2 is shared by .doc, .ppt, .msg and others, so it only names files that
+# have no extension at all.
+_SUFFIXLESS_ONLY = {".xls"}
+
+def read_header(file_path: Path) -> Optional[bytes]:
+    """First SNIFF_BYTES of the file, or None if it cannot be read."""
+    try:
+        with open(file_path, "rb") as file:
+            return file.read(SNIFF_BYTES)
+    except OSError:
+        return None
+
+def sniff_file_type(header: Optional[bytes]) -> Optional[Tuple[str, bool]]:
+    """Return (extension, authoritative) for a recognised header, else None."""
+    if not header:
+        return None
+    for signature, extension, authoritative in _MAGIC_INDEX.get(header[0], ()):
+        if header.startswith(signature):
+            return extension, authoritative
+    for offset, signature, extension, authoritative in _MAGIC_AT_OFFSET:
+        if header.startswith(signature, offset):
+            return extension, authoritative
+    text = header.lstrip(b"\xef\xbb\xbf \t\r\n")[:64].lower()
+    if text.startswith(b"<?xml"):
+        return ".xml", False
+    if text.startswith((b"<!doctype html", b"<html")):
+        return ".html", False
+    if text.startswith((b"{", b"[")):
+        return ".json", False
+    return None
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one.
+# Wide encodings name their byte order, so a slice without the BOM (such as a
+# tail preview) still decodes correctly.
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess the encoding of a text sample: a BOM if present, else UTF-8 if it decodes, else Latin-1."""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # Not final, so a multi-byte character cut off at the end of the sample is fine.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+class MappedFile:
+    """Read-only memory map of a file with line iteration and byte-range previews.
+
+    Slices copy only the bytes asked for and the OS pages the mapping in and
+    out, so files much larger than RAM can be scanned with flat memory.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Empty files cannot be mapped.
+        self._map: Union[mmap.mmap, bytes] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b"")
+
+    def __enter__(self) -> "MappedFile":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def read_range(self, start: int, end: Optional[int] = None) -> bytes:
+        return self._map[start:end]
+
+    def head(self, size: int) -> bytes:
+        return self._map[:size]
+
+    def tail(self, size: int) -> bytes:
+        return self._map[max(0, self.size - size):]
+
+    def iter_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield lines (with their newline) between two byte offsets."""
+        end = self.size if end is None else min(end, self.size)
+        position = start
+        while position < end:
+            newline = self._map.find(b"\n", position, end)
+            if newline < 0:
+                yield self._map[position:end]
+                return
+            yield self._map[position:newline + 1]
+            position = newline + 1
+
+    def count_lines(self, encoding: str = "utf-8", block_size: int = 1024 * 1024) -> int:
+        if encoding.startswith(("utf-16", "utf-32")):
+            return self._count_decoded_lines(encoding, block_size)
+        # In ASCII-compatible encodings a 0x0A byte is always a newline.
+        count = 0
+        for offset in range(0, self.size, block_size):
+            count += self._map[offset:offset + block_size].count(b"\n")
+        if self.size and self._map[self.size - 1] != ord("\n"):
+            count += 1
+        return count
+
+    def _count_decoded_lines(self, encoding: str, block_size: int) -> int:
+        # Wide encodings have 0x0A bytes inside other characters, so count decoded newlines.
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        count = 0
+        last = ""
+        for offset in range(0, self.size, block_size):
+            chunk = decoder.decode(self._map[offset:offset + block_size], final=offset + block_size >= self.size)
+            count += chunk.count("\n")
+            last = chunk[-1:] or last
+        if last and last != "\n":
+            count += 1
+        return count
+
 class FileHandler(ABC):
+    # CPU-bound handlers are sent to a process pool by the "auto" executor,
+    # everything else runs in threads.
+    cpu_bound: bool = False
+    # Bump when a handler's output changes so cached records are re-extracted.
+    version: str = "1"
+
+    @property
+    def cache_key(self) -> str:
+        return f"{type(self).__name__}:{self.version}"
+
     @abstractmethod
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         pass
 
+    def extract_sniffed(self, file_path: Path, header: bytes) -> Dict[str, Any]:
+        """Like extract_data, given the first SNIFF_BYTES of the file already read for dispatch."""
+        return self.extract_data(file_path)
+
 class TextFileHandler(FileHandler):
+    """Reads text files whole, or summarises large ones over a memory map.
+
+    Files of ``large_file_bytes`` or more are never loaded: the record holds
+    ``preview_bytes`` from the head (as ``content``) and tail, the line count
+    and an encoding detected from the head.
+    """
+    version = "2"
+
+    def __init__(self, large_file_bytes: int = 64 * 1024 * 1024, preview_bytes: int = 64 * 1024):
+        self.large_file_bytes = large_file_bytes
+        self.preview_bytes = preview_bytes
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.large_file_bytes}:{self.preview_bytes}"
+
+    def extract_sniffed(self, file_path: Path, header: bytes) -> Dict[str, Any]:
+        if len(header) < SNIFF_BYTES:
+            # The whole file is already in memory; decode with universal newlines like open().
+            content = header.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+            return {"type": "text", "content": content}
+        return self.extract_data(file_path)
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
+            if file_path.stat().st_size >= self.large_file_bytes:
+                return self._summarise(file_path)
             with open(file_path, "r", encoding="utf-8") as file:
                 content = file.read()
             return {"type": "text", "content": content}
@@ -29,52 +248,341 @@ class TextFileHandler(FileHandler):
             logger.error(f"Error reading text file {file_path}: {e}")
             return {"type": "text", "error": str(e)}
 
+    def _summarise(self, file_path: Path) -> Dict[str, Any]:
+        with MappedFile(file_path) as mapped:
+            head = mapped.head(self.preview_bytes)
+            encoding = detect_encoding(head)
+            tail_size = min(self.preview_bytes, mapped.size - len(head))
+            # Start the tail on a code unit boundary so wide encodings decode in step.
+            tail_size -= (tail_size - mapped.size) % _code_unit_size(encoding)
+            tail = mapped.tail(tail_size)
+            return {
+                "type": "text",
+                "content": _decode_preview(head, encoding, at_start=True),
+                "tail": _decode_preview(tail, encoding, at_start=False),
+                "encoding": encoding,
+                "size": mapped.size,
+                "num_lines": mapped.count_lines(encoding),
+                "truncated": True,
+            }
+
+def _code_unit_size(encoding: str) -> int:
+    if encoding.startswith("utf-32"):
+        return 4
+    return 2 if encoding.startswith("utf-16") else 1
+
+def _decode_preview(data: bytes, encoding: str, at_start: bool) -> str:
+    """Decode a preview cut from a larger file, trimming the partial line at the cut."""
+    if not data:
+        return ""
+    if not encoding.startswith(("utf-16", "utf-32")):
+        if at_start:
+            cut = data.rfind(b"\n")
+            data = data[:cut + 1] if cut >= 0 else data
+        else:
+            cut = data.find(b"\n")
+            data = data[cut + 1:] if cut >= 0 else data
+    text = data.decode(encoding, errors="replace")
+    if at_start:
+        # Byte-order-specific codecs keep the BOM as a character.
+        text = text[1:] if text.startswith("\ufeff") else text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
 class CSVFileHandler(FileHandler):
+    """Reads CSV files as row dicts or as compact typed columns.
+
+    ``mode="rows"`` keeps the original ``data`` list of dicts. ``mode="columnar"``
+    stores each column once: ints and floats in ``array`` buffers, strings
+    dictionary-encoded. Column types are inferred from the first
+    ``sample_rows`` rows and widened if later rows disagree. ``max_rows``
+    stops reading early, which is enough to report headers and a preview.
+    """
+    CSV_MODES = ("rows", "columnar")
+
+    def __init__(self, mode: str = "rows", max_rows: Optional[int] = None, batch_size: int = 10000,
+                 sample_rows: int = 1000):
+        if mode not in self.CSV_MODES:
+            raise ValueError(f"Unknown CSV mode: {mode}. Expected one of {', '.join(self.CSV_MODES)}.")
+        self.mode = mode
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.sample_rows = sample_rows
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.mode}:{self.max_rows}"
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                data = list(reader)
-            return {"type": "csv", "headers": reader.fieldnames, "data": data}
-        except IOError as e:
+            if self.mode == "columnar":
+                return self._extract_columnar(file_path)
+            headers: List[str] = []
+            data = []
+            truncated = False
+            for headers, rows, truncated in self._read_batches(file_path, self.batch_size):
+                data.extend(_csv_row_dict(headers, row) for row in rows)
+            result = {"type": "csv", "headers": headers, "data": data}
+            if self.max_rows is not None:
+                result["truncated"] = truncated
+            return result
+        except (IOError, csv.Error) as e:
             logger.error(f"Error reading CSV file {file_path}: {e}")
             return {"type": "csv", "error": str(e)}
 
+    def iter_batches(self, file_path: Path, batch_size: Optional[int] = None) -> Iterator[Tuple[List[str], List[List[str]]]]:
+        """Yield (headers, rows) with at most ``batch_size`` rows per batch."""
+        for headers, rows, _ in self._read_batches(file_path, batch_size or self.batch_size):
+            if rows:
+                yield headers, rows
+
+    def _read_batches(self, file_path: Path, batch_size: int) -> Iterator[Tuple[List[str], List[List[str]], bool]]:
+        # Always yields at least once, so a header-only file or max_rows=0
+        # still reports its headers. The flag is True on the last batch when
+        # max_rows stopped the read early, found by looking one row ahead.
+        with open(file_path, "r", encoding="utf-8", newline="") as file:
+            # Blank lines are skipped, as csv.DictReader does.
+            reader = (row for row in csv.reader(file) if row)
+            headers = next(reader, [])
+            remaining = self.max_rows
+            yielded = False
+            while remaining is None or remaining > 0:
+                limit = batch_size if remaining is None else min(batch_size, remaining)
+                rows = list(itertools.islice(reader, limit))
+                if not rows:
+                    break
+                truncated = False
+                if remaining is not None:
+                    remaining -= len(rows)
+                    truncated = remaining == 0 and next(reader, None) is not None
+                yield headers, rows, truncated
+                yielded = True
+            if not yielded:
+                yield headers, [], remaining == 0 and next(reader, None) is not None
+
+    def _extract_columnar(self, file_path: Path) -> Dict[str, Any]:
+        headers: List[str] = []
+        columns: List[_CSVColumn] = []
+        num_rows = 0
+        truncated = False
+        for headers, rows, truncated in self._read_batches(file_path, self.batch_size):
+            if not columns:
+                sample = rows[:self.sample_rows]
+                columns = [_CSVColumn(_infer_csv_type(row[i] if i < len(row) else "" for row in sample))
+                           for i in range(len(headers))]
+            for row in rows:
+                for i, column in enumerate(columns):
+                    column.append(row[i] if i < len(row) else "")
+            num_rows += len(rows)
+        result = {
+            "type": "csv",
+            "headers": headers,
+            "num_rows": num_rows,
+            "columns": {name: column.to_dict() for name, column in zip(headers, columns)}
+        }
+        if self.max_rows is not None:
+            result["truncated"] = truncated
+        return result
+
+def _csv_row_dict(headers: List[str], row: List[str]) -> Dict[Optional[str], Any]:
+    # Same shape as csv.DictReader: missing fields are None, extras go under the None key.
+    data: Dict[Optional[str], Any] = dict(zip(headers, row))
+    if len(row) > len(headers):
+        data[None] = row[len(headers):]
+    else:
+        for key in headers[len(row):]:
+            data[key] = None
+    return data
+
+def _infer_csv_type(values: Iterator[str]) -> str:
+    dtype = "int"
+    for value in values:
+        if value == "":
+            # Missing values are stored as NaN, which needs a float column.
+            if dtype == "int":
+                dtype = "float"
+            continue
+        if dtype == "int":
+            try:
+                int(value)
+                continue
+            except ValueError:
+                dtype = "float"
+        try:
+            float(value)
+        except ValueError:
+            return "str"
+    return dtype
+
+class _CSVColumn:
+    """A single CSV column stored as a typed array or a dictionary-encoded string column."""
+
+    def __init__(self, dtype: str):
+        self.dtype = dtype
+        self.values: Any = array.array("q") if dtype == "int" else array.array("d") if dtype == "float" else None
+        self.dictionary: Dict[str, int] = {}
+        self.codes = array.array("I")
+
+    def append(self, value: str) -> None:
+        if self.dtype == "int":
+            try:
+                self.values.append(int(value))
+                return
+            except (ValueError, OverflowError):
+                self._widen("float" if _infer_csv_type(iter([value])) == "float" else "str")
+        if self.dtype == "float":
+            try:
+                self.values.append(float(value) if value != "" else math.nan)
+                return
+            except ValueError:
+                self._widen("str")
+        code = self.dictionary.get(value)
+        if code is None:
+            code = self.dictionary[value] = len(self.dictionary)
+        self.codes.append(code)
+
+    def _widen(self, dtype: str) -> None:
+        # Values already read are converted; widening to str loses their original spelling.
+        old = self.values
+        self.dtype = dtype
+        if dtype == "float":
+            self.values = array.array("d", old)
+        else:
+            self.values = None
+            for value in old:
+                self.append("" if value != value else str(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.dtype == "str":
+            return {"dtype": "str", "dictionary": list(self.dictionary), "codes": self.codes}
+        return {"dtype": self.dtype, "values": self.values}
+
 class PDFFileHandler(FileHandler):
+    """Extracts PDF text page by page.
+
+    ``pages`` restricts extraction to a 0-based, end-exclusive page range.
+    With ``workers > 1``, documents of at least ``parallel_min_pages`` pages
+    are split into contiguous ranges extracted in separate processes.
+    """
+    cpu_bound = True
+    version = "2"
+
+    def __init__(self, pages: Optional[Tuple[int, Optional[int]]] = None, workers: int = 1,
+                 parallel_min_pages: int = 200):
+        self.pages = pages
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.pages}"
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
-            import PyPDF2
+            start, end = self.pages or (0, None)
             with open(file_path, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return {"type": "pdf", "content": text, "num_pages": len(pdf_reader.pages)}
+                reader = _pdf_reader()(file)
+                num_pages = len(reader.pages)
+                end = num_pages if end is None else min(end, num_pages)
+                if self.workers > 1 and end - start >= self.parallel_min_pages:
+                    pages = self._extract_parallel(file_path, start, end)
+                else:
+                    pages = list(_read_pages(reader, start, end))
+            return {
+                "type": "pdf",
+                "pages": [{"page": number, "text": text} for number, text in pages],
+                "num_pages": num_pages
+            }
         except ImportError:
-            logger.error("PyPDF2 module not found. Skipping PDF file.")
-            return {"type": "pdf", "error": "PyPDF2 module not found"}
+            logger.error("pypdf module not found. Skipping PDF file.")
+            return {"type": "pdf", "error": "pypdf module not found"}
         except Exception as e:
             logger.error(f"Error reading PDF file {file_path}: {e}")
             return {"type": "pdf", "error": str(e)}
 
+    def iter_pages(self, file_path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (1-based page number, text) for each page in [start, end)."""
+        with open(file_path, "rb") as file:
+            reader = _pdf_reader()(file)
+            yield from _read_pages(reader, start, len(reader.pages) if end is None else end)
+
+    def _extract_parallel(self, file_path: Path, start: int, end: int) -> List[Tuple[int, str]]:
+        step = -(-(end - start) // self.workers)
+        ranges = [(first, min(first + step, end)) for first in range(start, end, step)]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            chunks = pool.map(_extract_pdf_range, [file_path] * len(ranges), *zip(*ranges))
+            return [page for chunk in chunks for page in chunk]
+
+def _pdf_reader() -> Callable[..., Any]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+    return PdfReader
+
+def _read_pages(reader: Any, start: int, end: int) -> Iterator[Tuple[int, str]]:
+    for index in range(start, end):
+        yield index + 1, reader.pages[index].extract_text() or ""
+
+def _extract_pdf_range(file_path: Path, start: int, end: int) -> List[Tuple[int, str]]:
+    # Each worker opens the document once and extracts its contiguous range.
+    return list(PDFFileHandler().iter_pages(file_path, start, end))
+
 class ImageFileHandler(FileHandler):
+    """Describes images, optionally with their pixels as base64.
+
+    ``encode`` re-saves the full image (the original behaviour), ``raw`` passes
+    the file bytes through untouched, ``thumbnail`` downscales to at most
+    ``thumbnail_size`` pixels using draft-mode decoding where the format
+    supports it, and ``metadata`` only reads the header.
+    """
+    cpu_bound = True
+    IMAGE_MODES = ("encode", "raw", "thumbnail", "metadata")
+
+    def __init__(self, mode: str = "encode", thumbnail_size: int = 256):
+        if mode not in self.IMAGE_MODES:
+            raise ValueError(f"Unknown image mode: {mode}. Expected one of {', '.join(self.IMAGE_MODES)}.")
+        self.mode = mode
+        self.thumbnail_size = thumbnail_size
+        # Header-only and pass-through modes do no pixel work.
+        self.cpu_bound = mode in ("encode", "thumbnail")
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.mode}:{self.thumbnail_size}"
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
             from PIL import Image
-            import io
             import base64
             with Image.open(file_path) as img:
-                # Convert image to base64 string
-                buffered = io.BytesIO()
-                img.save(buffered, format=img.format)
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                return {
+                # Image.open only parses the header; pixels are decoded on demand.
+                result = {
                     "type": "image",
                     "format": img.format,
                     "mode": img.mode,
-                    "size": img.size,
-                    "base64": img_str
+                    "size": img.size
                 }
+                if self.mode == "raw":
+                    with open(file_path, "rb") as file:
+                        result["base64"] = base64.b64encode(file.read()).decode()
+                elif self.mode == "thumbnail":
+                    size = (self.thumbnail_size, self.thumbnail_size)
+                    img.draft("RGB", size)
+                    img.thumbnail(size)
+                    thumbnail_format = "JPEG" if img.format == "JPEG" else "PNG"
+                    buffered = io.BytesIO()
+                    img.save(buffered, format=thumbnail_format)
+                    result["thumbnail"] = {
+                        "format": thumbnail_format,
+                        "size": img.size,
+                        "base64": base64.b64encode(buffered.getvalue()).decode()
+                    }
+                elif self.mode == "encode":
+                    # Convert image to base64 string
+                    buffered = io.BytesIO()
+                    img.save(buffered, format=img.format)
+                    result["base64"] = base64.b64encode(buffered.getvalue()).decode()
+                return result
         except ImportError:
             logger.error("Pillow module not found. Skipping image file.")
             return {"type": "image", "error": "Pillow module not found"}
@@ -83,7 +591,61 @@ class ImageFileHandler(FileHandler):
             return {"type": "image", "error": str(e)}
 
 class JSONFileHandler(FileHandler):
+    """Parses JSON documents, and JSON Lines record by record over a memory map.
+
+    ``.ndjson``/``.jsonl`` files, and files whose first line is a complete JSON
+    value followed by more lines, are read as JSON Lines (``lines`` forces
+    either way). Their records are kept up to ``max_records`` while the rest
+    are still counted; ``iter_records`` streams them without building a list.
+    """
+    version = "2"
+    LINES_SUFFIXES = (".ndjson", ".jsonl")
+
+    def __init__(self, lines: Optional[bool] = None, max_records: Optional[int] = None):
+        self.lines = lines
+        self.max_records = max_records
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.lines}:{self.max_records}"
+
+    def extract_sniffed(self, file_path: Path, header: bytes) -> Dict[str, Any]:
+        if self._is_json_lines(file_path, header):
+            return self._extract_lines(file_path)
+        if len(header) < SNIFF_BYTES:
+            try:
+                return {"type": "json", "content": json.loads(header.decode("utf-8"))}
+            except json.JSONDecodeError as e:
+                logger.error(f"Error parsing JSON file {file_path}: {e}")
+                return {"type": "json", "error": str(e)}
+        return self._extract_document(file_path)
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
+        header = read_header(file_path)
+        if header is None:
+            return self._extract_document(file_path)
+        return self.extract_sniffed(file_path, header)
+
+    def iter_records(self, file_path: Path,
+                     on_error: Optional[Callable[[int, ValueError], None]] = None) -> Iterator[Any]:
+        """Yield each JSON Lines record, parsed straight from a memory map.
+
+        Blank lines are skipped. Malformed lines are skipped too, after calling
+        ``on_error`` with their 1-based line number.
+        """
+        with MappedFile(file_path) as mapped:
+            for line_number, line in enumerate(mapped.iter_lines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    if on_error is not None:
+                        on_error(line_number, e)
+                    continue
+                yield record
+
+    def _extract_document(self, file_path: Path) -> Dict[str, Any]:
         try:
             with open(file_path, "r", encoding="utf-8") as file:
                 data = json.load(file)
@@ -92,99 +654,855 @@ class JSONFileHandler(FileHandler):
             logger.error(f"Error parsing JSON file {file_path}: {e}")
             return {"type": "json", "error": str(e)}
 
+    def _extract_lines(self, file_path: Path) -> Dict[str, Any]:
+        # Line numbers of the first few malformed lines, plus a total count.
+        invalid: List[int] = []
+        num_invalid = 0
+
+        def on_error(line_number: int, error: ValueError) -> None:
+            nonlocal num_invalid
+            if not num_invalid:
+                logger.warning(f"Skipping malformed JSON line {line_number} in {file_path}: {error}")
+            if len(invalid) < 10:
+                invalid.append(line_number)
+            num_invalid += 1
+
+        records = []
+        num_records = 0
+        try:
+            for record in self.iter_records(file_path, on_error):
+                if self.max_records is None or num_records < self.max_records:
+                    records.append(record)
+                num_records += 1
+        except OSError as e:
+            logger.error(f"Error reading JSON Lines file {file_path}: {e}")
+            return {"type": "json", "error": str(e)}
+        data = {"type": "json", "lines": True, "content": records, "num_records": num_records,
+                "truncated": num_records > len(records)}
+        if num_invalid:
+            data.update(invalid_lines=invalid, num_invalid=num_invalid)
+        return data
+
+    def _is_json_lines(self, file_path: Path, header: bytes) -> bool:
+        if self.lines is not None:
+            return self.lines
+        if file_path.suffix.lower() in self.LINES_SUFFIXES:
+            return True
+        first_line, newline, rest = header.partition(b"\n")
+        if not newline:
+            if len(header) < SNIFF_BYTES:
+                return False
+            with open(file_path, "rb") as file:
+                first_line = file.readline(JSON_LINES_PROBE_BYTES)
+                if not first_line.endswith(b"\n") or not file.read(SNIFF_BYTES).strip():
+                    return False
+        elif not rest.strip() and len(header) < SNIFF_BYTES:
+            return False
+        try:
+            json.loads(first_line)
+        except ValueError:
+            return False
+        return True
+
 class XMLFileHandler(FileHandler):
+    """Converts XML to nested dicts with iterparse, clearing elements as they close.
+
+    Attributes are stored under ``@name`` keys and text under ``#text``. With
+    ``record_tag`` set, each matching element is emitted as a separate record
+    instead of building one document, so repeated-record exports can be
+    streamed with ``iter_records``.
+    """
+    version = "2"
+
+    def __init__(self, record_tag: Optional[str] = None, max_records: Optional[int] = None):
+        self.record_tag = record_tag
+        self.max_records = max_records
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.record_tag}:{self.max_records}"
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            return {"type": "xml", "content": self._element_to_dict(root)}
+            if self.record_tag is None:
+                content: Dict[str, Any] = {}
+                for content in self._iter_converted(file_path, None):
+                    pass
+                return {"type": "xml", "content": content}
+            records = list(itertools.islice(self.iter_records(file_path), self.max_records))
+            return {"type": "xml", "record_tag": self.record_tag, "records": records}
         except ET.ParseError as e:
             logger.error(f"Error parsing XML file {file_path}: {e}")
             return {"type": "xml", "error": str(e)}
 
-    def _element_to_dict(self, element):
-        result = {}
-        for child in element:
-            child_data = self._element_to_dict(child)
-            if child.tag in result:
-                if type(result[child.tag]) is list:
-                    result[child.tag].append(child_data)
-                else:
-                    result[child.tag] = [result[child.tag], child_data]
-            else:
-                result[child.tag] = child_data
-        if element.text and element.text.strip():
-            result['#text'] = element.text.strip()
-        return result
+    def iter_records(self, file_path: Path, record_tag: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield each ``record_tag`` element as a dict, one at a time."""
+        return self._iter_converted(file_path, record_tag or self.record_tag)
+
+    def _iter_converted(self, file_path: Path, record_tag: Optional[str]) -> Iterator[Dict[str, Any]]:
+        # Explicit stacks instead of recursion, so nesting depth is not limited.
+        stack: List[Dict[str, Any]] = []
+        elements: List[ET.Element] = []
+        for event, element in ET.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                stack.append({f"@{name}": value for name, value in element.attrib.items()})
+                elements.append(element)
+                continue
+            data = stack.pop()
+            elements.pop()
+            if element.text and element.text.strip():
+                data['#text'] = element.text.strip()
+            if record_tag is not None and element.tag == record_tag:
+                yield data
+            elif stack:
+                _add_xml_child(stack[-1], element.tag, data)
+            elif record_tag is None:
+                yield data
+            element.clear()
+            if elements:
+                # Closed children are usually the parent's only child left, so this is cheap.
+                elements[-1].remove(element)
+
+def _add_xml_child(result: Dict[str, Any], tag: str, child_data: Dict[str, Any]) -> None:
+    if tag in result:
+        if type(result[tag]) is list:
+            result[tag].append(child_data)
+        else:
+            result[tag] = [result[tag], child_data]
+    else:
+        result[tag] = child_data
+
+class ArchiveFileHandler(FileHandler):
+    """Base for archive handlers that extract members one at a time.
+
+    Each member is streamed to a temporary file and passed to the bound
+    FileProcessor's handler for its extension, so a PDF inside a zip gets PDF
+    extraction. Members without a handler are decoded as UTF-8 text, and a
+    member that fails gets its own error record. Members larger than
+    ``max_member_bytes`` are skipped, and extraction stops once
+    ``max_total_bytes`` have been decompressed, counting the members of nested
+    archives against the same budget. Archives nested more than ``max_depth``
+    levels deep are skipped. ``list_only`` returns the member index without
+    extracting anything. Records and chunks refer to members as
+    ``archive.zip!member`` (see ``member_ref``), e.g. in ``duplicate_of``.
+    """
+    archive_type = "archive"
+    archive_errors: Tuple[type, ...] = ()
+
+    def __init__(self, list_only: bool = False, max_member_bytes: int = 256 * 1024 * 1024,
+                 max_total_bytes: int = 1024 * 1024 * 1024, max_depth: int = 3):
+        self.list_only = list_only
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_depth = max_depth
+        self.processor: Optional["FileProcessor"] = None
+
+    @property
+    def cache_key(self) -> str:
+        return (f"{super().cache_key}:{self.list_only}:{self.max_member_bytes}:{self.max_total_bytes}"
+                f":{self.max_depth}")
+
+    def bind(self, processor: "FileProcessor") -> None:
+        self.processor = processor
 
-class ZIPFileHandler(FileHandler):
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
+        return self._extract_archive(file_path, self._new_context(file_path))
+
+    def _new_context(self, file_path: Path) -> "_ArchiveContext":
+        # During a directory run, members are de-duplicated against every file seen so far.
+        duplicates = self.processor._duplicates if self.processor is not None else None
+        return _ArchiveContext(self.max_total_bytes, str(file_path), duplicates or _DuplicateIndex())
+
+    def _extract_archive(self, file_path: Path, context: "_ArchiveContext") -> Dict[str, Any]:
         try:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                file_list = zip_ref.namelist()
-                content = {name: zip_ref.read(name).decode('utf-8', errors='ignore') for name in file_list if not name.endswith('/')}
-            return {"type": "zip", "file_list": file_list, "content": content}
-        except zipfile.BadZipFile as e:
-            logger.error(f"Error reading ZIP file {file_path}: {e}")
-            return {"type": "zip", "error": str(e)}
-
-class TARFileHandler(FileHandler):
-    def extract_data(self, file_path: Path) -> Dict[str, Any]:
+            if self.list_only:
+                members = self.list_members(file_path)
+                return {"type": self.archive_type, "file_list": [m["name"] for m in members], "members": members}
+            file_list: List[str] = []
+            content = dict(self.iter_members(file_path, file_list, context))
+            return {"type": self.archive_type, "file_list": file_list, "content": content}
+        except self.archive_errors as e:
+            logger.error(f"Error reading {self.archive_type.upper()} file {context.path}: {e}")
+            return {"type": self.archive_type, "error": str(e)}
+
+    def list_members(self, file_path: Path) -> List[Dict[str, Any]]:
+        return [{"name": name, "size": size, "is_file": is_file}
+                for name, size, is_file, _ in self._members(file_path)]
+
+    def iter_members(self, file_path: Path, file_list: Optional[List[str]] = None,
+                     context: Optional["_ArchiveContext"] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (member name, record) for each regular file, in archive order."""
+        if context is None:
+            context = self._new_context(file_path)
+        dedup = self.processor is not None and self.processor.dedup
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, size, is_file, open_member in self._members(file_path):
+                if file_list is not None:
+                    file_list.append(name)
+                if not is_file:
+                    continue
+                if size > self.max_member_bytes:
+                    logger.warning(f"Skipping {name} in {context.path}: {size} bytes exceeds member limit")
+                    yield name, {"type": "skipped", "error": f"Member exceeds {self.max_member_bytes} bytes"}
+                    continue
+                member_path = Path(tmp_dir) / f"member{PurePosixPath(name).suffix.lower()}"
+                limit = min(self.max_member_bytes, context.remaining)
+                # Members are hashed as they are copied, since the temporary file is gone by the
+                # time a same-sized file could turn up; this costs no extra read.
+                digest = _new_digest() if dedup else None
+                try:
+                    with open_member() as source, open(member_path, "wb") as target:
+                        written = _copy_limited(source, target, limit, digest=digest)
+                except (OSError, RuntimeError, EOFError, zipfile.BadZipFile, zlib.error) as e:
+                    # A corrupt or encrypted member; the members after it may still be readable.
+                    logger.error(f"Error reading {name} in {context.path}: {e}")
+                    yield name, {"type": "error", "error": f"{type(e).__name__}: {e}"}
+                    continue
+                if written > limit:
+                    # Declared sizes can lie, so the limits are enforced on the bytes actually read.
+                    logger.warning(f"Stopping extraction of {context.path}: size limit reached at {name}")
+                    yield name, {"type": "skipped", "error": "Archive size limit reached"}
+                    return
+                context.remaining -= written
+                if digest is not None:
+                    canonical = context.duplicates.canonical(member_ref(context.path, name), written,
+                                                             digest.hexdigest)
+                    if canonical is not None:
+                        yield name, _duplicate_extraction(canonical).data
+                        continue
+                yield name, self._extract_member(name, member_path, context)
+
+    def _extract_member(self, name: str, member_path: Path, context: "_ArchiveContext") -> Dict[str, Any]:
+        try:
+            if self.processor is not None:
+                header = read_header(member_path)
+                handler = self.processor.resolve_handler(member_path, header)
+                if isinstance(handler, ArchiveFileHandler):
+                    return self._extract_nested(handler, name, member_path, context)
+                if handler is not None:
+                    return _run_handler(handler, member_path, header)
+            with open(member_path, "rb") as file:
+                return {"type": "text", "content": file.read().decode('utf-8', errors='ignore')}
+        except Exception as e:
+            # One bad member must not cost the rest of the archive.
+            logger.error(f"Error extracting {name} in {context.path}: {e}")
+            return {"type": "error", "error": f"{type(e).__name__}: {e}"}
+
+    def _extract_nested(self, handler: "ArchiveFileHandler", name: str, member_path: Path,
+                        context: "_ArchiveContext") -> Dict[str, Any]:
+        if context.depth >= self.max_depth:
+            logger.warning(f"Skipping {name} in {context.path}: archives nested more than {self.max_depth} deep")
+            return {"type": "skipped", "error": f"Archive nested more than {self.max_depth} levels deep"}
+        outer_path = context.path
+        context.path = member_ref(outer_path, name)
+        context.depth += 1
+        try:
+            return handler._extract_archive(member_path, context)
+        finally:
+            context.depth -= 1
+            context.path = outer_path
+
+    @abstractmethod
+    def _members(self, file_path: Path) -> Iterator[Tuple[str, int, bool, Callable[[], IO[bytes]]]]:
+        """Yield (name, size, is_file, open_member) for every member in a single pass."""
+
+class _ArchiveContext:
+    """Extraction state shared by an archive and every archive nested inside it."""
+
+    def __init__(self, remaining: int, path: str, duplicates: "_DuplicateIndex"):
+        self.remaining = remaining  # decompressed bytes still allowed
+        self.path = path  # the archive being read, as a member_ref for nested ones
+        self.duplicates = duplicates
+        self.depth = 0
+
+def member_ref(archive: Union[Path, str], name: str) -> str:
+    """Reference to an archive member: ``archive.zip!member``, or ``a.zip!b.tar!member`` when nested."""
+    return f"{archive}{MEMBER_SEPARATOR}{name}"
+
+def _run_handler(handler: FileHandler, file_path: Path, header: Optional[bytes]) -> Dict[str, Any]:
+    # Without a header (the file could not be read) skip the sniffed shortcuts,
+    # so the handler opens the file itself and reports the real error.
+    if header is None:
+        return handler.extract_data(file_path)
+    return handler.extract_sniffed(file_path, header)
+
+def _copy_limited(source: IO[bytes], target: IO[bytes], limit: int, chunk_size: int = 1024 * 1024,
+                  digest: Optional[Any] = None) -> int:
+    """Copy at most ``limit`` bytes; returns ``limit + 1`` if the source had more.
+
+    ``digest`` (a hashlib object) is fed every byte copied.
+    """
+    written = 0
+    while written <= limit:
+        chunk = source.read(min(chunk_size, limit + 1 - written))
+        if not chunk:
+            break
+        target.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        written += len(chunk)
+    return written
+
+class ZIPFileHandler(ArchiveFileHandler):
+    archive_type = "zip"
+    archive_errors = (zipfile.BadZipFile,)
+
+    def _members(self, file_path: Path) -> Iterator[Tuple[str, int, bool, Callable[[], IO[bytes]]]]:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                yield info.filename, info.file_size, not info.is_dir(), lambda info=info: zip_ref.open(info)
+
+class TARFileHandler(ArchiveFileHandler):
+    archive_type = "tar"
+    archive_errors = (tarfile.TarError,)
+
+    def _members(self, file_path: Path) -> Iterator[Tuple[str, int, bool, Callable[[], IO[bytes]]]]:
+        # Iterating the TarFile reads each header once, unlike getmember() per name.
+        with tarfile.open(file_path, 'r:*') as tar_ref:
+            for member in tar_ref:
+                yield member.name, member.size, member.isfile(), lambda member=member: tar_ref.extractfile(member)
+
+class GZIPFileHandler(ArchiveFileHandler):
+    """Handles .gz files: tarballs go to TARFileHandler, anything else is a single compressed member."""
+    archive_type = "gzip"
+    archive_errors = (OSError, EOFError, tarfile.TarError)
+
+    def __init__(self, list_only: bool = False, max_member_bytes: int = 256 * 1024 * 1024,
+                 max_total_bytes: int = 1024 * 1024 * 1024, max_depth: int = 3):
+        super().__init__(list_only, max_member_bytes, max_total_bytes, max_depth)
+        self.tar_handler = TARFileHandler(list_only, max_member_bytes, max_total_bytes, max_depth)
+
+    def bind(self, processor: "FileProcessor") -> None:
+        super().bind(processor)
+        self.tar_handler.bind(processor)
+
+    def _extract_archive(self, file_path: Path, context: "_ArchiveContext") -> Dict[str, Any]:
         try:
-            with tarfile.open(file_path, 'r:*') as tar_ref:
-                file_list = tar_ref.getnames()
-                content = {}
-                for name in file_list:
-                    member = tar_ref.getmember(name)
-                    if member.isfile():
-                        f = tar_ref.extractfile(member)
-                        content[name] = f.read().decode('utf-8', errors='ignore')
-            return {"type": "tar", "file_list": file_list, "content": content}
-        except tarfile.TarError as e:
-            logger.error(f"Error reading TAR file {file_path}: {e}")
-            return {"type": "tar", "error": str(e)}
+            is_tar = tarfile.is_tarfile(file_path)
+        except (OSError, EOFError) as e:
+            logger.error(f"Error reading GZIP file {context.path}: {e}")
+            return {"type": self.archive_type, "error": str(e)}
+        if is_tar:
+            return self.tar_handler._extract_archive(file_path, context)
+        return super()._extract_archive(file_path, context)
+
+    def _members(self, file_path: Path) -> Iterator[Tuple[str, int, bool, Callable[[], IO[bytes]]]]:
+        # The uncompressed size is unknown up front; the limits are enforced while copying.
+        name = file_path.stem if file_path.suffix.lower() == ".gz" else file_path.name
+        yield name, 0, True, lambda: gzip.open(file_path, "rb")
 
 class HTMLFileHandler(FileHandler):
+    """Extracts the title, visible text and links from HTML.
+
+    Uses lxml when it is installed and otherwise a streaming tokenizer built
+    on the standard library's HTMLParser, so BeautifulSoup is not needed.
+    ``fields`` selects which of title/text/links to produce; asking for fewer
+    skips that work, and a title-only run stops reading after ``</title>``.
+    Script and style contents are never part of the text.
+    """
+    cpu_bound = True
+    version = "2"
+    HTML_FIELDS = ("title", "text", "links")
+    HTML_PARSERS = ("auto", "lxml", "stdlib")
+
+    def __init__(self, fields: Tuple[str, ...] = HTML_FIELDS, parser: str = "auto"):
+        unknown = set(fields) - set(self.HTML_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown HTML fields: {', '.join(sorted(unknown))}.")
+        if parser not in self.HTML_PARSERS:
+            raise ValueError(f"Unknown HTML parser: {parser}. Expected one of {', '.join(self.HTML_PARSERS)}.")
+        self.fields = tuple(fields)
+        self.parser = parser
+
+    @property
+    def cache_key(self) -> str:
+        # The two parsers differ in whitespace and edge cases, so their records are kept apart.
+        return f"{super().cache_key}:{','.join(self.fields)}:{self.resolved_parser}"
+
+    @property
+    def resolved_parser(self) -> str:
+        """The parser that actually runs: "auto" becomes lxml when it is installed."""
+        if self.parser == "auto":
+            return "lxml" if _lxml_html() is not None else "stdlib"
+        return self.parser
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
-            from bs4 import BeautifulSoup
-            with open(file_path, 'r', encoding="utf-8") as file:
-                soup = BeautifulSoup(file, 'html.parser')
-            return {
-                "type": "html",
-                "title": soup.title.string if soup.title else None,
-                "text": soup.get_text(),
-                "links": [{"href": link.get("href"), "text": link.text} for link in soup.find_all("a")]
-            }
+            if self.resolved_parser == "lxml":
+                result = self._extract_lxml(file_path)
+            else:
+                result = self._extract_stdlib(file_path)
+            return {"type": "html", **{field: result[field] for field in self.fields}}
         except ImportError:
-            logger.error("BeautifulSoup module not found. Skipping HTML file.")
-            return {"type": "html", "error": "BeautifulSoup module not found"}
+            logger.error("lxml module not found. Skipping HTML file.")
+            return {"type": "html", "error": "lxml module not found"}
         except Exception as e:
             logger.error(f"Error reading HTML file {file_path}: {e}")
             return {"type": "html", "error": str(e)}
 
+    def _extract_stdlib(self, file_path: Path) -> Dict[str, Any]:
+        parser = _HTMLTextParser(self.fields)
+        with open(file_path, 'r', encoding="utf-8") as file:
+            try:
+                for block in iter(lambda: file.read(64 * 1024), ""):
+                    parser.feed(block)
+                parser.close()
+            except _StopParsing:
+                pass
+        return parser.result()
+
+    def _extract_lxml(self, file_path: Path) -> Dict[str, Any]:
+        lxml_html = _lxml_html()
+        if lxml_html is None:
+            raise ImportError("lxml")
+        with open(file_path, "rb") as file:
+            content = file.read()
+        if not content.strip():
+            return {"title": None, "text": "", "links": []}
+        root = lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding="utf-8"))
+        for element in root.xpath("//script|//style"):
+            # drop_tree keeps the element's tail text, which belongs to the parent.
+            element.drop_tree()
+        return {
+            "title": root.findtext(".//title"),
+            "text": root.text_content() if "text" in self.fields else "",
+            "links": [{"href": link.get("href"), "text": link.text_content()} for link in root.iter("a")]
+                     if "links" in self.fields else []
+        }
+
+@functools.lru_cache(maxsize=None)
+def _lxml_html() -> Any:
+    try:
+        from lxml import html as lxml_html
+        return lxml_html
+    except ImportError:
+        return None
+
+class _StopParsing(Exception):
+    pass
+
+class _HTMLTextParser(HTMLParser):
+    """Collects title, text and links from a stream of HTML without building a tree."""
+    SKIP_TAGS = ("script", "style")
+
+    def __init__(self, fields: Tuple[str, ...] = HTMLFileHandler.HTML_FIELDS):
+        super().__init__(convert_charrefs=True)
+        self.want_text = "text" in fields
+        self.want_links = "links" in fields
+        self.title_only = tuple(fields) == ("title",)
+        self.title: Optional[str] = None
+        self.text_parts: List[str] = []
+        self.links: List[Dict[str, Any]] = []
+        self._title_parts: Optional[List[str]] = None
+        self._open_links: List[Tuple[Dict[str, Any], List[str]]] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag == "a" and self.want_links:
+            link = {"href": dict(attrs).get("href"), "text": ""}
+            self.links.append(link)
+            self._open_links.append((link, []))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+            if self.title_only:
+                raise _StopParsing()
+        elif tag == "a" and self._open_links:
+            link, parts = self._open_links.pop()
+            link["text"] = "".join(parts)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self.want_text:
+            self.text_parts.append(data)
+        for _, parts in self._open_links:
+            parts.append(data)
+
+    def result(self) -> Dict[str, Any]:
+        for link, parts in self._open_links:
+            link["text"] = "".join(parts)
+        self._open_links = []
+        return {"title": self.title, "text": "".join(self.text_parts), "links": self.links}
+
+def strip_html(markup: str) -> str:
+    """Return the visible text of an HTML fragment, without script or style contents."""
+    parser = _HTMLTextParser(("text",))
+    parser.feed(markup)
+    parser.close()
+    return "".join(parser.text_parts)
+
 class ExcelFileHandler(FileHandler):
+    """Streams .xlsx worksheets as row batches with openpyxl's read-only, values-only iteration.
+
+    Trailing empty columns and rows are trimmed from each sheet, so large
+    empty "used ranges" cost nothing in the output. Rows stay rectangular as
+    long as no later row is wider than the ones before it (see _trim_rows).
+    ``sheets`` selects worksheets by name and ``max_rows`` caps rows per sheet.
+    """
+    cpu_bound = True
+    version = "2"
+    reader_module = "openpyxl"
+
+    def __init__(self, sheets: Optional[List[str]] = None, max_rows: Optional[int] = None, batch_size: int = 1000):
+        self.sheets = sheets
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+
+    @property
+    def cache_key(self) -> str:
+        return f"{super().cache_key}:{self.sheets}:{self.max_rows}"
+
     def extract_data(self, file_path: Path) -> Dict[str, Any]:
         try:
-            import openpyxl
-            workbook = openpyxl.load_workbook(file_path, read_only=True)
-            data = {}
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                data[sheet_name] = [
-                    [cell.value for cell in row]
-                    for row in sheet.iter_rows()
-                ]
+            data: Dict[str, List[List[Any]]] = {}
+            for sheet_name, rows in self.iter_batches(file_path):
+                data.setdefault(sheet_name, []).extend(rows)
             return {"type": "excel", "sheets": data}
         except ImportError:
-            logger.error("openpyxl module not found. Skipping Excel file.")
-            return {"type": "excel", "error": "openpyxl module not found"}
+            logger.error(f"{self.reader_module} module not found. Skipping Excel file.")
+            return {"type": "excel", "error": f"{self.reader_module} module not found"}
         except Exception as e:
             logger.error(f"Error reading Excel file {file_path}: {e}")
             return {"type": "excel", "error": str(e)}
 
-class FileProcessor:
+    def iter_batches(self, file_path: Path, batch_size: Optional[int] = None) -> Iterator[Tuple[str, List[List[Any]]]]:
+        """Yield (sheet name, rows) batches; an empty sheet yields one empty batch."""
+        batch_size = batch_size or self.batch_size
+        for sheet_name, rows in self._iter_sheets(file_path):
+            batch: List[List[Any]] = []
+            emitted = False
+            for row in _trim_rows(rows, self.max_rows):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield sheet_name, batch
+                    batch = []
+                    emitted = True
+            if batch or not emitted:
+                yield sheet_name, batch
+
+    def _iter_sheets(self, file_path: Path) -> Iterator[Tuple[str, Iterator[Any]]]:
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            for sheet_name in workbook.sheetnames:
+                if self.sheets is None or sheet_name in self.sheets:
+                    yield sheet_name, workbook[sheet_name].iter_rows(values_only=True)
+        finally:
+            # Read-only workbooks keep the archive open until closed.
+            workbook.close()
+
+class XLSFileHandler(ExcelFileHandler):
+    """Reads legacy .xls workbooks with xlrd, loading one sheet at a time."""
+    reader_module = "xlrd"
+
+    def _iter_sheets(self, file_path: Path) -> Iterator[Tuple[str, Iterator[Any]]]:
+        import xlrd
+        workbook = xlrd.open_workbook(str(file_path), on_demand=True)
+        try:
+            for sheet_name in workbook.sheet_names():
+                if self.sheets is None or sheet_name in self.sheets:
+                    sheet = workbook.sheet_by_name(sheet_name)
+                    yield sheet_name, (sheet.row_values(index) for index in range(sheet.nrows))
+                    workbook.unload_sheet(sheet_name)
+        finally:
+            workbook.release_resources()
+
+def _trim_rows(rows: Iterator[Any], max_rows: Optional[int] = None) -> Iterator[List[Any]]:
+    """Drop trailing empty columns and trailing empty rows from a sheet.
+
+    Rows are streamed, so each one is cut to the widest non-empty width seen
+    so far (padding with None if it is shorter), which keeps cells in their
+    columns. Only a row wider than every earlier one makes the output ragged.
+    """
+    emitted = 0
+    blank = 0
+    width = 0
+    for row in rows:
+        values = list(row)
+        used = len(values)
+        while used and (values[used - 1] is None or values[used - 1] == ""):
+            used -= 1
+        if not used:
+            # Only a count is kept, so a long run of empty rows costs no memory.
+            blank += 1
+            continue
+        width = max(width, used)
+        for _ in range(blank):
+            if max_rows is not None and emitted >= max_rows:
+                return
+            yield [None] * width
+            emitted += 1
+        blank = 0
+        if max_rows is not None and emitted >= max_rows:
+            return
+        yield values[:width] + [None] * (width - len(values))
+        emitted += 1
+
+class ExtractionCache:
+    """Persistent store of handler output, keyed on path, size and mtime.
+
+    Entries are invalidated when the file changes or the handler's cache key
+    (class name and version) changes. The least recently used entries are
+    evicted once the stored records exceed ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 1024 * 1024 * 1024, verify_hash: bool = False):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.verify_hash = verify_hash
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(cache_dir / "extraction_cache.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, "
+            "handler TEXT, record TEXT, nbytes INTEGER, last_used INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def get(self, file_path: Path, handler_keys: Container[str]) -> Optional[Dict[str, Any]]:
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, digest, handler, record FROM entries WHERE path = ?",
+                (str(file_path),)
+            ).fetchone()
+            if row is None or row[:2] != (stat.st_size, stat.st_mtime_ns) or row[3] not in handler_keys:
+                self.misses += 1
+                return None
+        if self.verify_hash and row[2] != _file_digest(file_path):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE path = ?", (time.time_ns(), str(file_path)))
+            self.hits += 1
+        return json.loads(row[4])
+
+    def put(self, file_path: Path, handler_key: str, record: Dict[str, Any]) -> None:
+        # Failed extractions are retried on the next run rather than cached.
+        if "error" in record:
+            return
+        try:
+            stat = file_path.stat()
+            digest = _file_digest(file_path) if self.verify_hash else None
+        except OSError:
+            return
+        payload = json.dumps(record, ensure_ascii=False, default=json_default)
+        nbytes = len(payload)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._conn.execute("SELECT nbytes FROM entries WHERE path = ?", (str(file_path),)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(file_path), stat.st_size, stat.st_mtime_ns, digest, handler_key, payload, nbytes,
+                 time.time_ns())
+            )
+            self._total_bytes += nbytes - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT path, nbytes FROM entries ORDER BY last_used LIMIT 64").fetchall()
+            if not rows:
+                break
+            for path, nbytes in rows:
+                self._conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+                self._total_bytes -= nbytes
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "bytes": self._total_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+def _file_digest(file_path: Path) -> str:
+    digest = _new_digest()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _new_digest() -> Any:
+    return hashlib.blake2b(digest_size=16)
+
+class _DuplicateIndex:
+    """Byte-identical content seen during a run, from files on disk and archive members alike.
+
+    The first item of each size is remembered unhashed, with a way to hash it
+    later; digests are computed only once a second item of the same size
+    turns up, so a file with a unique size is never read again. Hashing
+    happens outside the index lock, and the first item of a size is always
+    registered before the item that triggered its hashing.
+    """
+
     def __init__(self):
+        self._lock = threading.Lock()
+        self._first: Dict[int, Tuple[str, "_OnceDigest"]] = {}
+        self._canonical: Dict[Tuple[int, str], str] = {}
+
+    def canonical(self, name: str, size: int, digest: Callable[[], Optional[str]]) -> Optional[str]:
+        """Name of an earlier item with the same bytes, or None after recording this one.
+
+        ``digest`` hashes the item; it may be called now or when a same-sized
+        item shows up later, so it must still work then.
+        """
+        with self._lock:
+            first = self._first.get(size)
+            if first is None:
+                self._first[size] = (name, _OnceDigest(digest))
+                return None
+        first_name, first_digest = first
+        first_value = first_digest.value()
+        value = _safe_digest(digest)
+        with self._lock:
+            if first_value is not None:
+                self._canonical.setdefault((size, first_value), first_name)
+            if value is None:
+                return None
+            canonical = self._canonical.setdefault((size, value), name)
+        return None if canonical == name else canonical
+
+class _OnceDigest:
+    """Computes a digest at most once, however many threads ask for it."""
+
+    def __init__(self, digest: Callable[[], Optional[str]]):
+        self._digest: Optional[Callable[[], Optional[str]]] = digest
+        self._value: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def value(self) -> Optional[str]:
+        with self._lock:
+            if self._digest is not None:
+                self._value = _safe_digest(self._digest)
+                self._digest = None
+            return self._value
+
+def _safe_digest(digest: Callable[[], Optional[str]]) -> Optional[str]:
+    try:
+        return digest()
+    except OSError as e:
+        logger.warning(f"Could not hash file for de-duplication: {e}")
+        return None
+
+class Extraction(NamedTuple):
+    data: Dict[str, Any]
+    handler_key: Optional[str]
+    handler_name: str
+    seconds: float
+
+class ProcessorStats:
+    """Counters, latency histograms and a slowest-files report for a FileProcessor run."""
+
+    # Upper bounds of the latency histogram buckets, in milliseconds.
+    LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf)
+
+    def __init__(self, slowest: int = 10):
+        self.slowest_n = slowest
+        self.by_extension: Dict[str, Dict[str, int]] = {}
+        self.by_handler: Dict[str, Dict[str, Any]] = {}
+        self._slowest: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, file_path: Path, handler_name: str, data: Dict[str, Any], seconds: float) -> None:
+        try:
+            bytes_in = file_path.stat().st_size
+        except OSError:
+            bytes_in = 0
+        bytes_out = len(json.dumps(data, ensure_ascii=False, default=json_default))
+        error = 1 if "error" in data else 0
+        bucket = next(i for i, bound in enumerate(self.LATENCY_BUCKETS_MS) if seconds * 1000 <= bound)
+        with self._lock:
+            for counters in (self.by_extension.setdefault(file_path.suffix.lower() or "(none)", self._new_counters()),
+                             self.by_handler.setdefault(handler_name, self._new_counters())):
+                counters["files"] += 1
+                counters["bytes_in"] += bytes_in
+                counters["bytes_out"] += bytes_out
+                counters["errors"] += error
+                counters["seconds"] += seconds
+            histogram = self.by_handler[handler_name].setdefault("histogram", [0] * len(self.LATENCY_BUCKETS_MS))
+            histogram[bucket] += 1
+            entry = (seconds, str(file_path), handler_name)
+            if len(self._slowest) < self.slowest_n:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @staticmethod
+    def _new_counters() -> Dict[str, Any]:
+        return {"files": 0, "bytes_in": 0, "bytes_out": 0, "errors": 0, "seconds": 0.0}
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        return [{"path": path, "handler": handler, "seconds": seconds}
+                for seconds, path, handler in sorted(self._slowest, reverse=True)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "by_extension": self.by_extension,
+            "by_handler": self.by_handler,
+            "latency_buckets_ms": [str(bound) for bound in self.LATENCY_BUCKETS_MS],
+            "slowest": self.slowest()
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'handler':<24}{'files':>8}{'errors':>8}{'MB in':>10}{'MB out':>10}{'seconds':>10}"]
+        for name, counters in sorted(self.by_handler.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{name:<24}{counters['files']:>8}{counters['errors']:>8}"
+                         f"{counters['bytes_in'] / 1e6:>10.2f}{counters['bytes_out'] / 1e6:>10.2f}"
+                         f"{counters['seconds']:>10.2f}")
+        lines.append("")
+        lines.append(f"{'extension':<24}{'files':>8}{'errors':>8}{'MB in':>10}{'MB out':>10}{'seconds':>10}")
+        for extension, counters in sorted(self.by_extension.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{extension:<24}{counters['files']:>8}{counters['errors']:>8}"
+                         f"{counters['bytes_in'] / 1e6:>10.2f}{counters['bytes_out'] / 1e6:>10.2f}"
+                         f"{counters['seconds']:>10.2f}")
+        lines.append("")
+        lines.append("Slowest files:")
+        for entry in self.slowest():
+            lines.append(f"  {entry['seconds']:8.3f}s  {entry['handler']:<20} {entry['path']}")
+        return "\n".join(lines)
+
+class FileProcessor:
+    def __init__(self, cache: Optional[ExtractionCache] = None, stats: Optional[ProcessorStats] = None,
+                 dedup: bool = False):
+        self.cache = cache
+        self.stats = stats
+        # Extract byte-identical files (and archive members) only once.
+        self.dedup = dedup
+        # Content seen so far in the current iter_directory run, shared with archive handlers.
+        self._duplicates: Optional[_DuplicateIndex] = None
+        # Hooks run in the calling process around each file. With a process
+        # pool, pre hooks run at submission and post hooks when the result is
+        # collected, with the time measured in the worker.
+        self.pre_hooks: List[Callable[[Path], None]] = []
+        self.post_hooks: List[Callable[[Path, Dict[str, Any], float], None]] = []
         self.handlers: Dict[str, FileHandler] = {
             ".txt": TextFileHandler(),
             ".log": TextFileHandler(),
@@ -195,40 +1513,607 @@ class FileProcessor:
             ".png": ImageFileHandler(),
             ".gif": ImageFileHandler(),
             ".json": JSONFileHandler(),
+            ".ndjson": JSONFileHandler(),
+            ".jsonl": JSONFileHandler(),
             ".xml": XMLFileHandler(),
             ".zip": ZIPFileHandler(),
             ".tar": TARFileHandler(),
-            ".gz": TARFileHandler(),
+            ".gz": GZIPFileHandler(),
             ".html": HTMLFileHandler(),
             ".htm": HTMLFileHandler(),
             ".xlsx": ExcelFileHandler(),
-            ".xls": ExcelFileHandler()
+            ".xls": XLSFileHandler()
         }
+        for handler in self.handlers.values():
+            if isinstance(handler, ArchiveFileHandler):
+                handler.bind(self)
 
     def register_handler(self, extension: str, handler: FileHandler) -> None:
+        if isinstance(handler, ArchiveFileHandler):
+            handler.bind(self)
         self.handlers[extension.lower()] = handler
 
+    def add_hooks(self, pre: Optional[Callable[[Path], None]] = None,
+                  post: Optional[Callable[[Path, Dict[str, Any], float], None]] = None) -> None:
+        if pre is not None:
+            self.pre_hooks.append(pre)
+        if post is not None:
+            self.post_hooks.append(post)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The cache, stats and hooks are only used by the parent process, never by pool workers.
+        state = self.__dict__.copy()
+        # Workers de-duplicate within each archive only; the run's index stays in the parent.
+        state.update(cache=None, stats=None, pre_hooks=[], post_hooks=[], _duplicates=None)
+        return state
+
     def process_file(self, file_path: Path) -> Dict[str, Any]:
-        file_extension = file_path.suffix.lower()
-        handler = self.handlers.get(file_extension)
+        for hook in self.pre_hooks:
+            hook(file_path)
+        cached = self._timed_from_cache(file_path)
+        if cached is not None:
+            self._finish(file_path, cached)
+            return cached.data
+        extraction = self._extract(file_path)
+        self._to_cache(file_path, extraction.handler_key, extraction.data)
+        self._finish(file_path, extraction)
+        return extraction.data
+
+    def resolve_handler(self, file_path: Path, header: Optional[bytes]) -> Optional[FileHandler]:
+        """Pick a handler from the file extension, overridden by the sniffed content type.
+
+        Authoritative signatures (PDF, images, gzip, tar) win over a
+        conflicting extension. Weak ones (zip containers, markup, JSON) are only
+        used when the extension has no handler, so .xlsx still goes to Excel.
+        OLE2 is used only for files without an extension, so .doc or .msg files
+        are reported as unhandled instead of failing as broken spreadsheets.
+        """
+        handler = self.handlers.get(file_path.suffix.lower())
+        sniffed = sniff_file_type(header)
+        if sniffed is None:
+            return handler
+        extension, authoritative = sniffed
+        sniffed_handler = self.handlers.get(extension)
+        if handler is None:
+            if extension in _SUFFIXLESS_ONLY and file_path.suffix:
+                return None
+            return sniffed_handler
+        if authoritative and type(sniffed_handler) is not type(handler):
+            logger.debug(f"{file_path} looks like {extension}, not {file_path.suffix}")
+            return sniffed_handler
+        return handler
+
+    def _extract(self, file_path: Path) -> Extraction:
+        start = time.perf_counter()
+        header = read_header(file_path)
+        handler = self.resolve_handler(file_path, header)
         if handler:
-            return handler.extract_data(file_path)
+            try:
+                data = _run_handler(handler, file_path, header)
+            except Exception as e:
+                # One bad file must never abort a directory run.
+                logger.error(f"Unhandled error extracting {file_path}: {e}")
+                data = {"type": "error", "error": f"{type(e).__name__}: {e}"}
+            return Extraction(data, handler.cache_key, type(handler).__name__, time.perf_counter() - start)
         else:
+            file_extension = file_path.suffix.lower()
             logger.warning(f"No handler for file extension: {file_path}")
-            return {"type": "unknown", "error": f"No handler for file extension: {file_extension}"}
+            data = {"type": "unknown", "error": f"No handler for file extension: {file_extension}"}
+            return Extraction(data, None, "unknown", time.perf_counter() - start)
 
-    def process_directory(self, directory: Path, recursive: bool = True) -> Dict[str, Dict[str, Any]]:
+    def _timed_from_cache(self, file_path: Path) -> Optional[Extraction]:
+        if self.cache is None:
+            return None
+        start = time.perf_counter()
+        data = self._from_cache(file_path)
+        if data is None:
+            return None
+        return Extraction(data, None, "ExtractionCache", time.perf_counter() - start)
+
+    def _finish(self, file_path: Path, extraction: Extraction) -> None:
+        if self.stats is not None:
+            self.stats.record(file_path, extraction.handler_name, extraction.data, extraction.seconds)
+        for hook in self.post_hooks:
+            hook(file_path, extraction.data, extraction.seconds)
+
+    def _from_cache(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        # Only a record made by the handler this file would be sent to now is valid.
+        handler = self.resolve_handler(file_path, read_header(file_path))
+        if handler is None:
+            return None
+        return self.cache.get(file_path, {handler.cache_key})
+
+    def _to_cache(self, file_path: Path, handler_key: Optional[str], data: Dict[str, Any]) -> None:
+        if self.cache is not None and handler_key is not None:
+            self.cache.put(file_path, handler_key, data)
+
+    def process_directory(self, directory: Path, recursive: bool = True, workers: int = 1,
+                          executor: str = "auto", dedup: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        return dict(self.iter_directory(directory, recursive, workers=workers, executor=executor, dedup=dedup))
+
+    def iter_directory(self, directory: Path, recursive: bool = True, workers: int = 1,
+                       executor: str = "auto", dedup: Optional[bool] = None,
+                       skip: Container[str] = ()) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, record) pairs in walk order as each file is extracted.
+
+        Only a bounded window of files is in flight at once, so memory use
+        depends on the largest records rather than the size of the directory.
+        With ``dedup``, byte-identical files are extracted once and later
+        copies get a ``duplicate`` record pointing at the first one. Archive
+        members take part too (as ``member_ref`` strings); with workers,
+        archives are then extracted in the calling thread, so the first copy
+        is the same one the serial path picks. Paths in
+        ``skip`` (such as those finished by an earlier run) are left out.
+        """
         if not directory.is_dir():
             raise ValueError(f"{directory} is not a valid directory.")
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}. Expected one of {', '.join(EXECUTORS)}.")
+
+        files = self._walk_files(directory, recursive)
+        if skip:
+            files = (file_path for file_path in files if str(file_path) not in skip)
+        if self.dedup if dedup is None else dedup:
+            self._duplicates = _DuplicateIndex()
+            entries = _find_duplicates(files, self._duplicates)
+        else:
+            entries = ((file_path, None) for file_path in files)
+        try:
+            yield from self._iter_entries(entries, workers, executor)
+        finally:
+            self._duplicates = None
 
-        results = {}
+    def _iter_entries(self, entries: Iterator[Tuple[Path, Optional[str]]], workers: int,
+                      executor: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if workers <= 1:
+            for file_path, canonical in entries:
+                if canonical is not None:
+                    duplicate = _duplicate_extraction(canonical)
+                    self._finish(file_path, duplicate)
+                    yield str(file_path), duplicate.data
+                else:
+                    yield str(file_path), self.process_file(file_path)
+            return
+
+        pools: Dict[str, Executor] = {}
+        pending: Deque[Tuple[Path, Future, bool]] = deque()
+        try:
+            for file_path, canonical in entries:
+                if canonical is not None:
+                    pending.append((file_path, _done(_duplicate_extraction(canonical)), False))
+                    continue
+                for hook in self.pre_hooks:
+                    hook(file_path)
+                cached = self._timed_from_cache(file_path)
+                if cached is not None:
+                    pending.append((file_path, _done(cached), False))
+                elif self._duplicates is not None and self._is_archive(file_path):
+                    # Archive members join the run's duplicate index, so archives are extracted
+                    # here, in walk order, to pick the same canonical copies as the serial path.
+                    pending.append((file_path, _done(self._extract(file_path)), True))
+                else:
+                    kind = self._executor_for(file_path, executor)
+                    pending.append((file_path, self._submit(pools, kind, workers, file_path), True))
+                # Yield in walk order so the output matches the serial path.
+                while len(pending) > workers * IN_FLIGHT_PER_WORKER:
+                    yield self._collect(*pending.popleft())
+            while pending:
+                yield self._collect(*pending.popleft())
+        finally:
+            for pool in pools.values():
+                pool.shutdown(cancel_futures=True)
+
+    def _is_archive(self, file_path: Path) -> bool:
+        return isinstance(self.resolve_handler(file_path, read_header(file_path)), ArchiveFileHandler)
+
+    def _submit(self, pools: Dict[str, Executor], kind: str, workers: Optional[int], file_path: Path) -> Future:
+        """Submit one file to the ``kind`` pool, creating it (or replacing a broken one) as needed."""
+        for attempt in range(2):
+            if kind not in pools:
+                if kind == "process":
+                    pools[kind] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                      initargs=(self,))
+                else:
+                    pools[kind] = ThreadPoolExecutor(max_workers=workers)
+            try:
+                if kind == "process":
+                    return pools[kind].submit(_process_in_worker, file_path)
+                return pools[kind].submit(self._extract, file_path)
+            except BrokenProcessPool:
+                # A worker died (e.g. a native crash in a parser). The files it had in
+                # flight come back as errors; the rest go to a fresh pool.
+                if attempt:
+                    raise
+                logger.warning(f"Process pool is broken; starting a new one for {file_path}")
+                pools.pop(kind).shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, file_path: Path, future: Future, extracted: bool) -> Tuple[str, Dict[str, Any]]:
+        try:
+            extraction = future.result()
+        except Exception as e:
+            extraction = _error_extraction(file_path, e)
+            extracted = False
+        if extracted:
+            self._to_cache(file_path, extraction.handler_key, extraction.data)
+        self._finish(file_path, extraction)
+        return str(file_path), extraction.data
+
+    async def aprocess_directory(self, directory: Path, recursive: bool = True, concurrency: int = 32,
+                                 workers: Optional[int] = None, executor: str = "auto",
+                                 skip: Container[str] = ()) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Asynchronously yield (path, record) pairs as files finish extracting.
+
+        Directory listing, stats, cache lookups and reads run in a thread pool,
+        so the event loop never blocks on slow (e.g. network) filesystems.
+        Subdirectories are listed concurrently and at most ``concurrency``
+        files are in flight or waiting to be consumed. CPU-bound handlers run
+        in a pool of ``workers`` processes (``executor`` routes them as in
+        ``iter_directory``). Records arrive in completion order, not walk order.
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}. Expected one of {', '.join(EXECUTORS)}.")
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=concurrency)
+        # Holds the process pool once a CPU-bound file needs it.
+        cpu_pools: Dict[str, Executor] = {}
+        # A slot is held from submission until the consumer takes the record.
+        slots = asyncio.Semaphore(concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        tasks: Set[asyncio.Task] = set()
+
+        async def extract(file_path: Path) -> None:
+            try:
+                for hook in self.pre_hooks:
+                    hook(file_path)
+                extraction = await loop.run_in_executor(io_pool, self._timed_from_cache, file_path)
+                if extraction is None:
+                    if self._executor_for(file_path, executor) == "process":
+                        future = self._submit(cpu_pools, "process", workers, file_path)
+                        extraction = await asyncio.wrap_future(future)
+                    else:
+                        extraction = await loop.run_in_executor(io_pool, self._extract, file_path)
+                    await loop.run_in_executor(io_pool, self._to_cache, file_path,
+                                               extraction.handler_key, extraction.data)
+            except Exception as e:
+                extraction = _error_extraction(file_path, e)
+            self._finish(file_path, extraction)
+            results.put_nowait((str(file_path), extraction.data))
+
+        async def walk(path: Path) -> None:
+            files, subdirectories = await loop.run_in_executor(io_pool, _scan_directory, path)
+            listing = asyncio.gather(*(walk(subdirectory) for subdirectory in subdirectories)) \
+                if recursive else None
+            try:
+                for file_path in files:
+                    if str(file_path) in skip:
+                        continue
+                    await slots.acquire()
+                    task = loop.create_task(extract(file_path))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                if listing is not None:
+                    await listing
+
+        async def produce() -> None:
+            try:
+                await walk(directory)
+                await asyncio.gather(*tasks)
+            finally:
+                results.put_nowait(None)
+
+        if not await loop.run_in_executor(io_pool, directory.is_dir):
+            io_pool.shutdown(wait=False)
+            raise ValueError(f"{directory} is not a valid directory.")
+        producer = loop.create_task(produce())
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    await producer  # re-raises a failed directory listing
+                    return
+                slots.release()
+                yield item
+        finally:
+            producer.cancel()
+            for task in list(tasks):
+                task.cancel()
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            for pool in cpu_pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _walk_files(self, directory: Path, recursive: bool = True) -> Iterator[Path]:
         for entry in os.scandir(directory):
             entry_path = Path(entry)
             if entry.is_file():
-                results[str(entry_path)] = self.process_file(entry_path)
+                yield entry_path
             elif recursive and entry.is_dir():
-                results.update(self.process_directory(entry_path))
-        return results
+                yield from self._walk_files(entry_path)
+
+    def _executor_for(self, file_path: Path, executor: str) -> str:
+        if executor != "auto":
+            return executor
+        handler = self.handlers.get(file_path.suffix.lower())
+        return "process" if handler is not None and handler.cpu_bound else "thread"
+
+def _find_duplicates(files: Iterator[Path], index: _DuplicateIndex) -> Iterator[Tuple[Path, Optional[str]]]:
+    """Yield (path, canonical path or None) in walk order, as the walk proceeds.
+
+    A file is hashed only once another file (or archive member) of the same
+    size has been seen, so unique sizes never cost a full read.
+    """
+    for file_path in files:
+        try:
+            size = file_path.stat().st_size
+        except OSError:
+            yield file_path, None
+            continue
+        yield file_path, index.canonical(str(file_path), size, functools.partial(_file_digest, file_path))
+
+def _scan_directory(directory: Path) -> Tuple[List[Path], List[Path]]:
+    """List one directory level as (files, subdirectories); runs in a worker thread."""
+    files: List[Path] = []
+    subdirectories: List[Path] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files.append(Path(entry))
+            elif entry.is_dir():
+                subdirectories.append(Path(entry))
+    return files, subdirectories
+
+def _duplicate_extraction(canonical: Union[Path, str]) -> Extraction:
+    return Extraction({"type": "duplicate", "duplicate_of": str(canonical)}, None, "duplicate", 0.0)
+
+def _done(extraction: Extraction) -> Future:
+    future: Future = Future()
+    future.set_result(extraction)
+    return future
+
+def _error_extraction(file_path: Path, error: Exception) -> Extraction:
+    # Failures outside the handler (a dead worker process, a failing hook) are
+    # reported for that file alone and never cached.
+    logger.error(f"Error processing {file_path}: {type(error).__name__}: {error}")
+    return Extraction({"type": "error", "error": f"{type(error).__name__}: {error}"}, None, "error", 0.0)
+
+# Each process-pool worker gets its own copy of the processor once, instead of
+# pickling it alongside every submitted file.
+_worker_processor: Optional[FileProcessor] = None
+
+def _init_worker(processor: FileProcessor) -> None:
+    global _worker_processor
+    _worker_processor = processor
+
+def _process_in_worker(file_path: Path) -> Extraction:
+    return _worker_processor._extract(file_path)
+
+# Words, numbers and single punctuation marks, the units estimate_tokens counts.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def _token_cost(piece: str) -> int:
+    # Subword tokenizers average roughly one token per six characters of a long word.
+    return 1 + (len(piece) - 1) // 6
+
+def estimate_tokens(text: str) -> int:
+    """Cheap approximation of an LLM tokenizer's token count for ``text``."""
+    return sum(_token_cost(match.group()) for match in _TOKEN_RE.finditer(text))
+
+class TextChunker:
+    """Splits text-bearing records into bounded, overlapping chunks.
+
+    Chunks are at most ``max_tokens`` estimated tokens and repeat the last
+    ``overlap`` tokens of the previous chunk. Each chunk carries the character
+    offsets it covers in its source text, the page number for PDFs, and the
+    row range for CSVs. Archive members are chunked under ``archive!member``.
+    """
+
+    def __init__(self, max_tokens: int = 512, overlap: int = 64):
+        if overlap >= max_tokens:
+            raise ValueError("Chunk overlap must be smaller than the chunk size.")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    def chunk_records(self, records: Iterator[Tuple[str, Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        for file_path, data in records:
+            yield from self.chunk_record(file_path, data)
+
+    def chunk_record(self, file_path: str, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        record_type = data.get("type")
+        if "error" in data:
+            return
+        if record_type in ("text", "docx") and data.get("content"):
+            sources = [(data["content"], {})]
+        elif record_type == "html" and data.get("text"):
+            sources = [(data["text"], {})]
+        elif record_type == "pdf":
+            sources = [(page["text"], {"page": page["page"]}) for page in data.get("pages", [])]
+        elif record_type == "csv" and "data" in data:
+            yield from self._chunk_rows(file_path, data["data"])
+            return
+        elif record_type in ("zip", "tar", "gzip"):
+            for name, member in data.get("content", {}).items():
+                yield from self.chunk_record(member_ref(file_path, name), member)
+            return
+        else:
+            return
+        index = 0
+        for text, extra in sources:
+            for start, end, tokens in self._spans(text):
+                yield {"path": file_path, "type": record_type, "chunk": index, **extra,
+                       "start": start, "end": end, "tokens": tokens, "text": text[start:end]}
+                index += 1
+
+    def _spans(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, tokens) character spans of ``text``, lazily."""
+        window: Deque[Tuple[int, int, int]] = deque()
+        tokens = 0
+        for start, end, cost in self._pieces(text):
+            if window and tokens + cost > self.max_tokens:
+                yield window[0][0], window[-1][1], tokens
+                # Keep the tail of the chunk as the overlap for the next one.
+                kept = 0
+                tail: Deque[Tuple[int, int, int]] = deque()
+                while window and kept + window[-1][2] <= self.overlap:
+                    piece = window.pop()
+                    kept += piece[2]
+                    tail.appendleft(piece)
+                # Shrink the overlap further if the incoming piece would not fit beside it.
+                while tail and kept + cost > self.max_tokens:
+                    kept -= tail.popleft()[2]
+                window = tail
+                tokens = kept
+            window.append((start, end, cost))
+            tokens += cost
+        if window:
+            yield window[0][0], window[-1][1], tokens
+
+    def _pieces(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        # Words costing more than a whole chunk are cut into chunk-sized pieces.
+        max_chars = self.max_tokens * 6
+        for match in _TOKEN_RE.finditer(text):
+            cost = _token_cost(match.group())
+            if cost <= self.max_tokens:
+                yield match.start(), match.end(), cost
+                continue
+            for start in range(match.start(), match.end(), max_chars):
+                end = min(start + max_chars, match.end())
+                yield start, end, _token_cost(text[start:end])
+
+    def _chunk_rows(self, file_path: str, rows: List[Dict[Any, Any]]) -> Iterator[Dict[str, Any]]:
+        # CSV chunks never split a row; offsets are row indices instead of characters.
+        lines: List[str] = []
+        tokens = 0
+        first = 0
+        index = 0
+        for row_index, row in enumerate(rows):
+            line = ", ".join(f"{key}: {value}" for key, value in row.items())
+            cost = estimate_tokens(line)
+            if lines and tokens + cost > self.max_tokens:
+                yield {"path": file_path, "type": "csv", "chunk": index, "rows": [first, row_index],
+                       "tokens": tokens, "text": "\n".join(lines)}
+                index += 1
+                lines, tokens, first = [], 0, row_index
+            lines.append(line)
+            tokens += cost
+        if lines:
+            yield {"path": file_path, "type": "csv", "chunk": index, "rows": [first, len(rows)],
+                   "tokens": tokens, "text": "\n".join(lines)}
+
+class RunJournal:
+    """Append-only NDJSON record of finished files, used to resume interrupted runs."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: Optional[IO[str]] = None
+        # Failed paths that the last load(retry_failed=True) left to be processed again.
+        self.failed: Set[str] = set()
+
+    def load(self, retry_failed: bool = False) -> Set[str]:
+        """Paths to skip on resume; the last entry for a path wins. Corrupt lines are skipped."""
+        statuses: Dict[str, str] = {}
+        if self.path.exists():
+            _truncate_partial_line(self.path)
+            with open(self.path, "r", encoding="utf-8") as file:
+                for number, line in enumerate(file, start=1):
+                    try:
+                        entry = json.loads(line)
+                        statuses[entry["path"]] = entry["status"]
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Skipping corrupt line {number} of {self.path}: {e}")
+        self.failed = {path for path, status in statuses.items() if status != "ok"} if retry_failed else set()
+        return set(statuses) - self.failed
+
+    def forget(self, paths: Set[str]) -> None:
+        """Drop every entry for ``paths``, e.g. before retrying them."""
+        self.close()
+        _drop_json_lines(self.path, paths)
+
+    def reset(self) -> None:
+        self.close()
+        open(self.path, "w", encoding="utf-8").close()
+
+    def record(self, file_path: str, data: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        status = "error" if "error" in data else "ok"
+        self._file.write(json.dumps({"path": file_path, "status": status, "time": time.time()}) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def _drop_json_lines(path: Path, paths: Set[str]) -> None:
+    """Rewrite a JSON Lines file without the lines whose "path" is in ``paths``."""
+    if not paths or not path.exists():
+        return
+    _truncate_partial_line(path)
+    partial = path.with_name(path.name + ".part")
+    with open(path, "r", encoding="utf-8") as source, open(partial, "w", encoding="utf-8") as target:
+        for line in source:
+            try:
+                if json.loads(line).get("path") in paths:
+                    continue
+            except (ValueError, AttributeError):
+                pass
+            target.write(line)
+    os.replace(partial, path)
+
+def _truncate_partial_line(path: Path) -> None:
+    """Drop a trailing line left incomplete by a crash, so appends start on a fresh line."""
+    if not path.exists():
+        return
+    with open(path, "rb+") as file:
+        size = file.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            step = min(64 * 1024, position)
+            file.seek(position - step)
+            block = file.read(step)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position < size:
+            file.truncate(position)
+
+def stream_records(records: Iterator[Tuple[str, Dict[str, Any]]], stream: IO[str],
+                   chunker: Optional[TextChunker] = None, journal: Optional[RunJournal] = None) -> int:
+    """Write records (or their chunks) as NDJSON and journal each file once its lines are flushed."""
+    count = 0
+    for file_path, data in records:
+        if chunker is not None:
+            write_json_lines(chunker.chunk_record(file_path, data), stream)
+        else:
+            write_ndjson(iter([(file_path, data)]), stream)
+        if journal is not None:
+            journal.record(file_path, data)
+        count += 1
+    return count
+
+def json_default(obj: Any) -> Any:
+    # Columnar handlers keep values in typed arrays until they are serialised.
+    if isinstance(obj, array.array):
+        if obj.typecode in "fd":
+            return [None if value != value else value for value in obj]
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def write_ndjson(records: Iterator[Tuple[str, Dict[str, Any]]], stream: IO[str]) -> int:
+    return write_json_lines(({"path": file_path, "data": data} for file_path, data in records), stream)
+
+def write_json_lines(items: Iterator[Dict[str, Any]], stream: IO[str]) -> int:
+    count = 0
+    for item in items:
+        stream.write(json.dumps(item, ensure_ascii=False, default=json_default))
+        stream.write("\n")
+        stream.flush()
+        count += 1
+    return count
 
 def main() -> None:
     import argparse
@@ -239,24 +2124,155 @@ def main() -> None:
     parser.add_argument("--recursive", action="store_true", help="Process subdirectories recursively")
     parser.add_argument("--log", choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], 
                         default='INFO', help="Set the logging level")
-    parser.add_argument("--output", type=str, help="Output file path for extracted data (JSON format)")
+    parser.add_argument("--output", type=str, help="Output file path for extracted data")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json",
+                        help="Output format; 'ndjson' writes one record per line as each file finishes")
+    parser.add_argument("--chunk", action="store_true",
+                        help="Write text chunks (NDJSON) ready for embedding instead of whole records")
+    parser.add_argument("--chunk-tokens", type=int, default=512, help="Maximum estimated tokens per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=64, help="Estimated tokens repeated between chunks")
+    parser.add_argument("--journal", type=str,
+                        help="Progress journal path (default: <output>.journal when --resume is used)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip files already recorded in the journal and append to the existing output")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="With --resume, process failed files again, replacing their earlier output")
+    parser.add_argument("--workers", type=int, default=1, help="Number of files to process in parallel")
+    parser.add_argument("--executor", choices=EXECUTORS, default="auto",
+                        help="Pool type for --workers; 'auto' sends CPU-bound handlers to processes")
+    parser.add_argument("--csv-mode", choices=CSVFileHandler.CSV_MODES, default="rows",
+                        help="Emit CSV files as row dicts or as typed columns")
+    parser.add_argument("--csv-max-rows", type=int, help="Only read this many rows from each CSV file")
+    parser.add_argument("--text-large-mb", type=int, default=64,
+                        help="Summarise text and log files at least this large instead of loading them")
+    parser.add_argument("--text-preview-kb", type=int, default=64,
+                        help="Head and tail preview size for summarised text files")
+    parser.add_argument("--json-max-records", type=int, help="Only keep this many records from each JSON Lines file")
+    parser.add_argument("--image-mode", choices=ImageFileHandler.IMAGE_MODES, default="encode",
+                        help="How much of each image to emit; 'metadata' skips pixel decoding entirely")
+    parser.add_argument("--thumbnail-size", type=int, default=256, help="Longest edge for --image-mode thumbnail")
+    parser.add_argument("--html-fields", choices=HTMLFileHandler.HTML_FIELDS, nargs="+",
+                        default=list(HTMLFileHandler.HTML_FIELDS), help="Which parts of HTML files to extract")
+    parser.add_argument("--excel-sheets", type=str, nargs="+", help="Only read these worksheets")
+    parser.add_argument("--excel-max-rows", type=int, help="Only read this many rows per worksheet")
+    parser.add_argument("--pdf-workers", type=int, default=1,
+                        help="Split large PDFs into page ranges extracted by this many processes")
+    parser.add_argument("--xml-record-tag", type=str,
+                        help="Emit each element with this tag as a separate XML record")
+    parser.add_argument("--archive-list-only", action="store_true",
+                        help="List ZIP/TAR members without extracting them")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Extract byte-identical files once and reference the first copy from the others")
+    parser.add_argument("--stats", action="store_true", help="Print per-handler timing and byte counters at the end")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest files listed by --stats")
+    parser.add_argument("--profile", type=str,
+                        help="Write cProfile stats for file extraction to this path (profiles serial runs)")
+    parser.add_argument("--cache-dir", type=str, help="Directory for the persistent extraction cache")
+    parser.add_argument("--cache-size-mb", type=int, default=1024, help="Maximum size of the extraction cache")
+    parser.add_argument("--cache-verify-hash", action="store_true",
+                        help="Also compare a content hash before serving cached records")
 
     args = parser.parse_args()
 
     # Set logging level based on argument
     logging.getLogger().setLevel(args.log)
+    if (args.resume or args.journal) and not (args.output and (args.chunk or args.format == "ndjson")):
+        parser.error("--resume and --journal need --output with --format ndjson or --chunk")
+    exit_code = 0
 
-    processor = FileProcessor()
+    cache = None
+    if args.cache_dir:
+        cache = ExtractionCache(Path(args.cache_dir), max_bytes=args.cache_size_mb * 1024 * 1024,
+                                verify_hash=args.cache_verify_hash)
+    stats = ProcessorStats(slowest=args.slowest) if args.stats else None
+    processor = FileProcessor(cache=cache, stats=stats, dedup=args.dedup)
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        processor.add_hooks(pre=lambda file_path: profiler.enable(),
+                            post=lambda file_path, data, seconds: profiler.disable())
+    processor.register_handler(".csv", CSVFileHandler(mode=args.csv_mode, max_rows=args.csv_max_rows))
+    text_handler = TextFileHandler(large_file_bytes=args.text_large_mb * 1024 * 1024,
+                                   preview_bytes=args.text_preview_kb * 1024)
+    for extension in (".txt", ".log"):
+        processor.register_handler(extension, text_handler)
+    if args.json_max_records is not None:
+        json_handler = JSONFileHandler(max_records=args.json_max_records)
+        for extension in (".json", ".ndjson", ".jsonl"):
+            processor.register_handler(extension, json_handler)
+    image_handler = ImageFileHandler(mode=args.image_mode, thumbnail_size=args.thumbnail_size)
+    for extension in (".jpg", ".jpeg", ".png", ".gif"):
+        processor.register_handler(extension, image_handler)
+    if args.xml_record_tag:
+        processor.register_handler(".xml", XMLFileHandler(record_tag=args.xml_record_tag))
+    if tuple(args.html_fields) != HTMLFileHandler.HTML_FIELDS:
+        html_handler = HTMLFileHandler(fields=tuple(args.html_fields))
+        processor.register_handler(".html", html_handler)
+        processor.register_handler(".htm", html_handler)
+    if args.excel_sheets or args.excel_max_rows is not None:
+        processor.register_handler(".xlsx", ExcelFileHandler(sheets=args.excel_sheets, max_rows=args.excel_max_rows))
+        processor.register_handler(".xls", XLSFileHandler(sheets=args.excel_sheets, max_rows=args.excel_max_rows))
+    if args.pdf_workers > 1:
+        processor.register_handler(".pdf", PDFFileHandler(workers=args.pdf_workers))
+    if args.archive_list_only:
+        for extension in (".zip", ".tar", ".gz"):
+            processor.register_handler(extension, type(processor.handlers[extension])(list_only=True))
     try:
-        results = processor.process_directory(Path(args.directory), args.recursive)
+        if args.chunk or args.format == "ndjson":
+            journal = None
+            done: Set[str] = set()
+            if args.journal or args.resume:
+                journal = RunJournal(Path(args.journal or f"{args.output}.journal"))
+                if args.resume:
+                    done = journal.load(retry_failed=args.retry_failed)
+                    logger.info(f"Resuming: skipping {len(done)} files already in {journal.path}")
+                    if journal.failed:
+                        # Drop the old records of the files being retried so each path keeps a single
+                        # record. The journal goes first: if this is interrupted, a later resume
+                        # re-processes those files instead of skipping files with no output.
+                        journal.forget(journal.failed)
+                        _drop_json_lines(Path(args.output), journal.failed)
+                else:
+                    journal.reset()
+            records = processor.iter_directory(Path(args.directory), args.recursive, workers=args.workers,
+                                               executor=args.executor, skip=done)
+            chunker = TextChunker(args.chunk_tokens, args.chunk_overlap) if args.chunk else None
+            try:
+                if args.output:
+                    if args.resume:
+                        _truncate_partial_line(Path(args.output))
+                    with open(args.output, 'a' if args.resume else 'w', encoding='utf-8') as f:
+                        stream_records(records, f, chunker=chunker, journal=journal)
+                    logger.info(f"Results written to {args.output}")
+                else:
+                    stream_records(records, sys.stdout, chunker=chunker, journal=journal)
+            finally:
+                if journal is not None:
+                    journal.close()
+            return
+
+        results = processor.process_directory(Path(args.directory), args.recursive,
+                                               workers=args.workers, executor=args.executor)
         if args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+                json.dump(results, f, indent=2, ensure_ascii=False, default=json_default)
             logger.info(f"Results written to {args.output}")
         else:
-            print(json.dumps(results, indent=2, ensure_ascii=False))
+            print(json.dumps(results, indent=2, ensure_ascii=False, default=json_default))
     except Exception as e:
-        logger.critical(f"An error occurred: {e}")
+        logger.critical(f"An error occurred: {e}", exc_info=True)
+        exit_code = 1
+    finally:
+        if stats is not None:
+            print(stats.format_summary(), file=sys.stderr)
+        if profiler is not None:
+            profiler.dump_stats(args.profile)
+        if cache is not None:
+            logger.info(f"Cache stats: {cache.stats()}")
+            cache.close()
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,126 @@
 import csv
+import argparse
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
+
+import pandas as pd
 from pyfinviz.screener import Screener
 
-page = 475
-
-screener = Screener(pages=[x for x in range(1, page)])
-
-list_ticker = []
-for i in range(0, page):
-    if i == 1 or i not in screener.data_frames:
-        pass
-    else:
-        for j in range(len(screener.data_frames[i])):
-            list_ticker.append(screener.data_frames[i].Ticker[j])
-        list(list_ticker)
-
-# Write the list of tickers to a CSV file
-with open('tickers.csv', 'w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Ticker"])
-    for ticker in list_ticker:
-        writer.writerow([ticker])
\ No newline at end of file
+FIRST_PAGE = 1
+LAST_PAGE = 474
+
+
+class FakeScreener:
+    """Stand-in for pyfinviz's Screener serving canned pages from page_<n>.csv files."""
+
+    def __init__(self, directory: str, pages: List[int]):
+        self.data_frames: Dict[int, pd.DataFrame] = {}
+        for page in pages:
+            path = os.path.join(directory, f"page_{page}.csv")
+            if os.path.exists(path):
+                self.data_frames[page] = pd.read_csv(path)
+
+
+def fetch_page(page: int, screener_factory: Callable[..., object] = Screener) -> List[str]:
+    frame = screener_factory(pages=[page]).data_frames.get(page)
+    if frame is None or "Ticker" not in frame:
+        return []
+    return frame["Ticker"].dropna().astype(str).str.strip().tolist()
+
+
+def load_checkpoint(checkpoint_file: str) -> int:
+    try:
+        with open(checkpoint_file) as file:
+            return json.load(file)["last_page"]
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(checkpoint_file: str, last_page: int) -> None:
+    partial = checkpoint_file + ".part"
+    with open(partial, "w") as file:
+        json.dump({"last_page": last_page}, file)
+    os.replace(partial, checkpoint_file)
+
+
+def load_tickers(output_file: str) -> Set[str]:
+    if not os.path.exists(output_file):
+        return set()
+    with open(output_file, newline='') as file:
+        return {row["Ticker"] for row in csv.DictReader(file)}
+
+
+def harvest(output_file: str = 'tickers.csv', first_page: int = FIRST_PAGE, last_page: int = LAST_PAGE,
+            workers: int = 4, checkpoint_file: Optional[str] = None,
+            screener_factory: Callable[..., object] = Screener) -> Dict[str, int]:
+    """Fetch screener pages concurrently, appending new tickers to output_file as each page lands.
+
+    The checkpoint holds the highest page below which every page is done, so
+    a rerun starts after it. Pages finished past that mark are fetched again,
+    but their tickers are already in the output and are not written twice.
+    """
+    checkpoint_file = checkpoint_file or output_file + '.checkpoint'
+    done_through = max(load_checkpoint(checkpoint_file), first_page - 1)
+    seen = load_tickers(output_file)
+    summary = {"pages": 0, "new_tickers": 0, "failed_pages": 0}
+    completed: Set[int] = set()
+    pending: Dict[Future, int] = {}
+    pages = iter(range(done_through + 1, last_page + 1))
+
+    write_header = not os.path.exists(output_file)
+    with open(output_file, 'a', newline='') as file, ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = csv.writer(file)
+        if write_header:
+            writer.writerow(["Ticker"])
+        while True:
+            # Keep a bounded number of pages in flight.
+            while len(pending) < workers * 2:
+                page = next(pages, None)
+                if page is None:
+                    break
+                pending[pool.submit(fetch_page, page, screener_factory)] = page
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                page = pending.pop(future)
+                try:
+                    tickers = future.result()
+                except Exception as e:
+                    print(f"Page {page} failed: {e}")
+                    summary["failed_pages"] += 1
+                    continue
+                new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in seen]
+                seen.update(new)
+                writer.writerows([ticker] for ticker in new)
+                summary["pages"] += 1
+                summary["new_tickers"] += len(new)
+                completed.add(page)
+            file.flush()
+            # Only advance the checkpoint once the rows it covers are on disk.
+            advanced = done_through
+            while advanced + 1 in completed:
+                advanced += 1
+                completed.discard(advanced)
+            if advanced != done_through:
+                done_through = advanced
+                save_checkpoint(checkpoint_file, done_through)
+    summary["last_page"] = done_through
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest every ticker from the Finviz screener")
+    parser.add_argument("--output", default="tickers.csv")
+    parser.add_argument("--first-page", type=int, default=FIRST_PAGE)
+    parser.add_argument("--last-page", type=int, default=LAST_PAGE)
+    parser.add_argument("--workers", type=int, default=4, help="Pages fetched at once")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--fake", help="Serve canned page_<n>.csv frames from this directory instead of Finviz")
+    args = parser.parse_args()
+
+    factory = (lambda pages: FakeScreener(args.fake, pages)) if args.fake else Screener
+    print(json.dumps(harvest(args.output, args.first_page, args.last_page, args.workers, args.checkpoint,
+                             screener_factory=factory)))
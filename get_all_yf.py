@@ -1,47 +1,218 @@
 import yfinance as yf
 import os
 import pandas as pd
-import csv
-import requests_cache
-from requests import Session
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+from requests import Response, Session
 from requests_cache import CacheMixin, SQLiteCache
 from requests_ratelimiter import LimiterMixin, MemoryQueueBucket
 from pyrate_limiter import Duration, RequestRate, Limiter
-from pandas_datareader import data as pdr
-import sqlite3
-
-yf.pdr_override() # <== that's all it takes :-)
 
 class CachedLimiterSession(CacheMixin, LimiterMixin, Session):
     pass
 
-session = CachedLimiterSession(
-    limiter=Limiter(RequestRate(2, Duration.SECOND*5)),  # max 2 requests per 5 seconds
-    bucket_class=MemoryQueueBucket,
-    backend=SQLiteCache("yfinance.cache"),
-)
+def session_options() -> dict:
+    return dict(
+        limiter=Limiter(RequestRate(2, Duration.SECOND*5)),  # max 2 requests per 5 seconds
+        bucket_class=MemoryQueueBucket,
+        backend=SQLiteCache("yfinance.cache"),
+    )
+
+def _response_key(method: str, url: str, params) -> str:
+    # The crumb changes per session, so it is left out of the key.
+    params = sorted((k, str(v)) for k, v in dict(params or {}).items() if k != "crumb")
+    return hashlib.sha1(f"{method.upper()} {url}?{urlencode(params)}".encode()).hexdigest()
+
+class RecordingSession(CachedLimiterSession):
+    """Rate-limited session that also saves every response under record_dir for ReplaySession."""
+
+    def __init__(self, record_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.record_dir = record_dir
+        os.makedirs(record_dir, exist_ok=True)
+
+    def request(self, method, url, params=None, **kwargs):
+        response = super().request(method, url, params=params, **kwargs)
+        record = {"url": url, "status": response.status_code, "headers": dict(response.headers),
+                  "body": response.text}
+        with open(os.path.join(self.record_dir, _response_key(method, url, params) + ".json"), "w") as f:
+            json.dump(record, f)
+        return response
+
+class ReplaySession(Session):
+    """Offline stub that serves responses saved by RecordingSession; unknown requests get a 404."""
+
+    def __init__(self, record_dir: str):
+        super().__init__()
+        self.record_dir = record_dir
+
+    def request(self, method, url, params=None, **kwargs):
+        response = Response()
+        response.url = url
+        response.request = None
+        path = os.path.join(self.record_dir, _response_key(method, url, params) + ".json")
+        if not os.path.exists(path):
+            response.status_code = 404
+            response._content = b'{"chart": {"result": null, "error": {"code": "Not Found"}}}'
+            return response
+        with open(path) as f:
+            record = json.load(f)
+        response.status_code = record["status"]
+        response.headers.update({k: v for k, v in record["headers"].items()
+                                 if k.lower() not in ("content-encoding", "content-length")})
+        response._content = record["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+class HistoryStore:
+    """Per-symbol, per-day partitions: <root>/<SYMBOL>/<YYYY-MM-DD>.<parquet|feather>."""
+
+    def __init__(self, root: str, file_format: str = "parquet"):
+        self.root = root
+        self.file_format = file_format
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.replace("/", "_"))
 
-try:
-    symbol_file = 'symbols_only.txt'
-    all_history = []
+    def _partitions(self, symbol: str) -> List[str]:
+        directory = self._symbol_dir(symbol)
+        if not os.path.isdir(directory):
+            return []
+        suffix = "." + self.file_format
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
 
+    def _read(self, path: str) -> pd.DataFrame:
+        frame = pd.read_parquet(path) if self.file_format == "parquet" else pd.read_feather(path)
+        return frame.set_index(frame.columns[0])
+
+    def _write(self, frame: pd.DataFrame, path: str) -> None:
+        # Written under a temporary name so a crash never leaves a truncated partition.
+        partial = path + ".part"
+        if self.file_format == "parquet":
+            frame.reset_index().to_parquet(partial, index=False)
+        else:
+            frame.reset_index().to_feather(partial)
+        os.replace(partial, path)
+
+    def last_timestamp(self, symbol: str) -> Optional[pd.Timestamp]:
+        partitions = self._partitions(symbol)
+        if not partitions:
+            return None
+        return self._read(partitions[-1]).index.max()
+
+    def write(self, symbol: str, frame: pd.DataFrame) -> int:
+        """Write a symbol's rows into its day partitions, merging with rows already stored."""
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        frame = frame.rename_axis(frame.index.name or "Datetime")
+        for day, part in frame.groupby(frame.index.date):
+            path = os.path.join(directory, f"{day.isoformat()}.{self.file_format}")
+            if os.path.exists(path):
+                part = pd.concat([self._read(path), part])
+                part = part[~part.index.duplicated(keep="last")].sort_index()
+            self._write(part, path)
+        return len(frame)
+
+def read_symbols(symbol_file: str) -> List[str]:
     with open(symbol_file, 'r') as file:
-        for line in file:
-            symbol = line.strip()
+        # Blank lines are skipped and duplicates dropped, keeping file order.
+        return list(dict.fromkeys(symbol for symbol in (line.strip() for line in file) if symbol))
 
-            if not isinstance(symbol, str):
-                continue
-            history = yf.download(symbol, period="60d", interval="5m")
-            # Add the ticker symbol as a column to the history DataFrame
-            history['Ticker'] = symbol
+def plan_batches(symbols: List[str], store: HistoryStore, batch_size: int,
+                 skip_existing: bool) -> Iterator[Tuple[Optional[pd.Timestamp], List[str]]]:
+    """Group symbols by download start: None for a full period, else the last stored day."""
+    groups: Dict[Optional[pd.Timestamp], List[str]] = {}
+    for symbol in symbols:
+        last = store.last_timestamp(symbol)
+        if last is not None and skip_existing:
+            continue
+        # Re-fetch the last stored day in full; the store de-duplicates the overlap.
+        start = None if last is None else pd.Timestamp(last.date())
+        groups.setdefault(start, []).append(symbol)
+    for start, group in groups.items():
+        for i in range(0, len(group), batch_size):
+            yield start, group[i:i + batch_size]
 
-            # Append the history DataFrame to the all_history list
-            all_history.append(history)
+def download_batch(symbols: List[str], session: Session, start: Optional[pd.Timestamp],
+                   period: str, interval: str) -> Dict[str, pd.DataFrame]:
+    """Download a batch of symbols one by one; returns the non-empty frame of each symbol.
+
+    Ticker.history keeps no module-global state, unlike yf.download (which
+    collects results in yfinance.shared), so batches can run in parallel.
+    """
+    kwargs = {"start": start.strftime("%Y-%m-%d")} if start is not None else {"period": period}
+    frames = {}
+    for symbol in symbols:
+        frame = yf.Ticker(symbol, session=session).history(interval=interval, actions=False, **kwargs)
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+def download_all(symbols: List[str], store: HistoryStore, session: Session, period: str = "60d",
+                 interval: str = "5m", batch_size: int = 50, workers: int = 4,
+                 skip_existing: bool = False) -> Dict[str, int]:
+    """Download symbols in concurrent batches, storing each batch as soon as it arrives.
+
+    All requests go through the one session, so its rate limiter bounds the
+    request rate however many workers are waiting on it. A batch that fails to
+    download or to store is counted and skipped; the other batches carry on.
+    """
+    summary = {"symbols": len(symbols), "downloaded": 0, "rows": 0, "missing": 0, "failed_batches": 0}
+    batches = list(plan_batches(symbols, store, batch_size, skip_existing))
+    summary["skipped"] = len(symbols) - sum(len(batch) for _, batch in batches)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download_batch, batch, session, start, period, interval): batch
+                   for start, batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                frames = future.result()
+            except Exception as e:
+                print(f"Batch starting {batch[0]} failed: {e}")
+                summary["failed_batches"] += 1
+                continue
+            try:
+                rows = sum(store.write(symbol, frame) for symbol, frame in frames.items())
+            except Exception as e:
+                print(f"Storing batch starting {batch[0]} failed: {e}")
+                summary["failed_batches"] += 1
+                continue
+            summary["rows"] += rows
+            summary["downloaded"] += len(frames)
+            summary["missing"] += len(batch) - len(frames)
+    return summary
 
-    # Concatenate all the DataFrames in the list into a single DataFrame
-    all_history_df = pd.concat(all_history)
+def main():
+    parser = argparse.ArgumentParser(description="Download intraday history for every symbol into a local store")
+    parser.add_argument("--symbols", default="symbols_only.txt", help="File with one symbol per line")
+    parser.add_argument("--store", default="history", help="Root directory of the history store")
+    parser.add_argument("--format", choices=("parquet", "feather"), default="parquet")
+    parser.add_argument("--period", default="60d", help="History to fetch for symbols not yet stored")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--batch-size", type=int, default=50, help="Symbols downloaded per worker task")
+    parser.add_argument("--workers", type=int, default=4, help="Batches in flight at once")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Skip stored symbols instead of fetching from their last timestamp")
+    parser.add_argument("--record", help="Save every response in this directory for offline replay")
+    parser.add_argument("--replay", help="Serve responses recorded with --record instead of the network")
+    args = parser.parse_args()
 
-    all_history_df.to_csv('all_history.csv')
+    if args.replay:
+        session = ReplaySession(args.replay)
+    elif args.record:
+        session = RecordingSession(args.record, **session_options())
+    else:
+        session = CachedLimiterSession(**session_options())
+    store = HistoryStore(args.store, args.format)
+    summary = download_all(read_symbols(args.symbols), store, session, period=args.period,
+                           interval=args.interval, batch_size=args.batch_size, workers=args.workers,
+                           skip_existing=args.skip_existing)
+    print(json.dumps(summary))
 
-except Exception as e:
-    print(e)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
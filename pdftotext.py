@@ -1,18 +1,17 @@
-from pypdf import PdfReader
+from pathlib import Path
 import os
 
+from file_loader import PDFFileHandler
+
 file_path = "./docs/"
 
+handler = PDFFileHandler()
 file_list = os.listdir(file_path)
 for file in file_list:
     if file.endswith('.pdf'):
-        pdf_file = open(file_path + file, 'rb')
-
-        pdf_reader = PdfReader(pdf_file)
-        x = len(pdf_reader.pages)
-        pageobj = pdf_reader.pages[0]
-        text = pageobj.extract_text()
         file_name = file.split(".")[0]
-        with open(file_name + ".txt", "w", encoding='utf-8') as file:  # Specify the encoding
-            file.writelines(text)
-        file.close()  # Close the file after writing to it
\ No newline at end of file
+        with open(file_name + ".txt", "w", encoding='utf-8') as output:  # Specify the encoding
+            # Pages are written as they are extracted instead of holding the whole document.
+            for page_number, text in handler.iter_pages(Path(file_path) / file):
+                output.write(text)
+                output.write("\n")
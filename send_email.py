@@ -1,21 +1,218 @@
 import smtplib
+import argparse
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from email.message import EmailMessage
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Errors after which the connection is unusable and is re-opened before retrying.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def build_message(sender: str, recipients: Sequence[str], subject: str, text: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(text)
+    return message
+
+
+class SMTPMailer:
+    """Sends messages over a pool of persistent SMTP sessions.
+
+    Each of ``pool_size`` worker threads keeps one logged-in connection and
+    drains a bounded queue of messages, so the connect/STARTTLS/login
+    handshake happens once per worker instead of once per message. A dropped
+    connection is re-opened and the message retried once. ``max_per_connection``
+    re-opens sessions after that many messages, for servers that cap them.
+    """
+
+    def __init__(self, host: str = "smtp.gmail.com", port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True, pool_size: int = 4,
+                 queue_size: int = 1000, max_per_connection: Optional[int] = None, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = pool_size
+        self.max_per_connection = max_per_connection
+        self.timeout = timeout
+        self._queue: "queue.Queue[Optional[Tuple[EmailMessage, Future]]]" = queue.Queue(maxsize=queue_size)
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SMTPMailer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.pool_size):
+                worker = threading.Thread(target=self._work, name=f"smtp-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self) -> None:
+        server: Optional[smtplib.SMTP] = None
+        sent = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            message, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if server is not None and self.max_per_connection and sent >= self.max_per_connection:
+                    _quit(server)
+                    server = None
+                for attempt in range(2):
+                    if server is None:
+                        server = self._connect()
+                        sent = 0
+                    try:
+                        server.send_message(message)
+                        break
+                    except CONNECTION_ERRORS:
+                        _quit(server)
+                        server = None
+                        if attempt:
+                            raise
+                sent += 1
+                future.set_result(None)
+            except Exception as e:
+                future.set_exception(e)
+        if server is not None:
+            _quit(server)
+
+    def submit(self, message: EmailMessage) -> Future:
+        """Queue a message; blocks while the queue is full. The future fails if sending does."""
+        self._start()
+        future: Future = Future()
+        self._queue.put((message, future))
+        return future
+
+    def send(self, message: EmailMessage) -> None:
+        self.submit(message).result()
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> List[Tuple[EmailMessage, BaseException]]:
+        """Send messages over the pooled sessions and return the ones that failed, with their errors."""
+        futures = [(message, self.submit(message)) for message in messages]
+        return [(message, future.exception()) for message, future in futures if future.exception() is not None]
+
+    def close(self) -> None:
+        """Finish the queued messages and log out of every session."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+
+def _quit(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
 
 
 def sendemail(FROM, TO, SUBJECT, TEXT, EMAIL, PASSWORD):
-    message = """
-From: %s
-To: %s
-Subject: %s
-
-%s
-	""" % (
-        FROM,
-        ", ".join(TO),
-        SUBJECT,
-        TEXT,
-    )
-    server = smtplib.SMTP("smtp.gmail.com", 587)
-    server.starttls()
-    server.login(EMAIL, PASSWORD)
-    server.sendmail(FROM, TO, message)
-    server.quit()
\ No newline at end of file
+    with SMTPMailer(username=EMAIL, password=PASSWORD, pool_size=1) as mailer:
+        mailer.send(build_message(FROM, TO, SUBJECT, TEXT))
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP sink (no TLS or auth) that counts accepted messages, for benchmarks."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0)):
+        super().__init__(address, _StubSMTPHandler)
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class _StubSMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self._reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self._reply("250-stub")
+                self._reply("250 8BITMIME")
+            elif command == b"DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 OK")
+            elif command == b"QUIT":
+                self._reply("221 Bye")
+                return
+            elif command in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self._reply("250 OK")
+            else:
+                self._reply("502 Command not implemented")
+
+
+def benchmark(count: int = 1000, pool_size: int = 4) -> None:
+    """Compare one connection per message with the pooled mailer against a local stub server."""
+    server = StubSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    messages = [build_message("alerts@example.com", ["oncall@example.com"], f"Alert {i}", "Disk almost full")
+                for i in range(count)]
+    try:
+        start = time.perf_counter()
+        for message in messages[:count // 10 or 1]:
+            with SMTPMailer(host, port, starttls=False, pool_size=1) as mailer:
+                mailer.send(message)
+        single = (count // 10 or 1) / (time.perf_counter() - start)
+
+        connections = server.connections
+        start = time.perf_counter()
+        with SMTPMailer(host, port, starttls=False, pool_size=pool_size) as mailer:
+            failed = mailer.send_many(messages)
+        pooled = count / (time.perf_counter() - start)
+        print(f"one connection per message: {single:.0f} messages/s")
+        print(f"pooled ({pool_size} sessions, {server.connections - connections} connections): "
+              f"{pooled:.0f} messages/s, {len(failed)} failed")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pooled mailer against a local stub SMTP server")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+    benchmark(args.messages, args.pool_size)
@@ -1,45 +1,119 @@
-from typing import Dict, Union
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from pypdf import PdfReader, PdfWriter
+import argparse
+import os
 import re
 
-def bookmark_dict(bookmark_list, reader, **kw):
-    result = kw.get('result', {})
-    use_labels = kw.get('use_labels', False)
-    for item in bookmark_list:
-        if isinstance(item, list):
-            bookmark_dict(item, reader, use_labels=use_labels, result=result)
+
+class Section(NamedTuple):
+    title: str
+    start: int  # first page index
+    end: int    # one past the last page index
+
+
+def iter_bookmarks(bookmark_list, reader: PdfReader) -> Iterator[Tuple[int, str]]:
+    """Yield (page index, title) for every outline entry, depth first, without recursion."""
+    stack = [iter(bookmark_list)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+        elif isinstance(item, list):
+            stack.append(iter(item))
         else:
-            if "Table" not in item.title:
-                page_index = reader.get_destination_page_number(item)
-                page_label = reader.page_labels[page_index]
-                key = page_label if use_labels else page_index
-                if key not in result:
-                    result[key] = []
-                result[key].append(dict(title=item.title, page=key))
-    print(result)
-    return result
-def split_and_save(result, reader):
+            yield reader.get_destination_page_number(item), item.title
+
+
+def section_title(title: str) -> str:
+    """File name for a bookmark; numbered headings are grouped under "Section N.0"."""
+    valid_filename = re.sub(r'[<>:"/\\|?*]', '_', title)
+    if '.' in valid_filename and valid_filename.split('.')[0].isdigit():
+        return f"Section {valid_filename.split('.')[0]}.0"
+    return valid_filename
+
+
+def build_section_index(reader: PdfReader, exclude: Sequence[str] = ("Table",)) -> List[Section]:
+    """Map the outline to contiguous page ranges in one pass.
+
+    Bookmarks are sorted by page number and consecutive bookmarks with the
+    same section title are merged. Each section runs from its first page to
+    the start of the next section, and the last one runs to the end of the
+    document. Bookmarks whose title contains any of the exclude strings are
+    ignored.
+    """
+    bookmarks = sorted(((page, title) for page, title in iter_bookmarks(reader.outline, reader)
+                        if page is not None and not any(text in title for text in exclude)),
+                       key=lambda bookmark: bookmark[0])
+    starts: List[Tuple[str, int]] = []
+    for page, title in bookmarks:
+        title = section_title(title)
+        if not starts or starts[-1][0] != title:
+            starts.append((title, page))
+    num_pages = len(reader.pages)
+    sections = []
+    used_titles = set()
+    for i, (title, start) in enumerate(starts):
+        next_start = starts[i + 1][1] if i + 1 < len(starts) else num_pages
+        # A title that reappears later in the document gets its own file.
+        unique_title, n = title, 1
+        while unique_title in used_titles:
+            n += 1
+            unique_title = f"{title} ({n})"
+        used_titles.add(unique_title)
+        # Sections starting on the same page both get that page.
+        sections.append(Section(unique_title, start, max(next_start, start + 1)))
+    return sections
+
+
+# Each worker process opens the source PDF once and reuses it for all its sections.
+_reader: Optional[PdfReader] = None
+
+
+def _init_worker(pdf_path: str) -> None:
+    global _reader
+    _reader = PdfReader(pdf_path)
+
+
+def write_section(section: Section, output_dir: str, reader: Optional[PdfReader] = None) -> str:
+    reader = reader or _reader
     pdf_writer = PdfWriter()
-    current_section = None
-    for key, value in sorted(result.items(), key=lambda n: f"{str(n[0]):>5}"):
-        for item in value:
-            valid_filename = re.sub(r'[<>:"/\\|?*]', '_', item['title'])
-            if '.' in valid_filename and valid_filename.split('.')[0].isdigit():
-                section_title = f"Section {valid_filename.split('.')[0]}.0"
-            else:
-                section_title = valid_filename
-            if current_section is None or section_title != current_section:
-                if current_section is not None:
-                    with open(f"./pdfs/{current_section}.pdf", 'wb') as output_file:
-                        pdf_writer.write(output_file)
-                pdf_writer = PdfWriter()
-                current_section = section_title
-            pdf_writer.add_page(reader.pages[key])
-    if current_section is not None:
-        with open(f"./pdfs/{current_section}.pdf", 'wb') as output_file:
-            pdf_writer.write(output_file)
+    for page_index in range(section.start, section.end):
+        pdf_writer.add_page(reader.pages[page_index])
+    output_path = os.path.join(output_dir, f"{section.title}.pdf")
+    with open(output_path, 'wb') as output_file:
+        pdf_writer.write(output_file)
+    return output_path
+
+
+def split_and_save(pdf_path: str, output_dir: str = "./pdfs", exclude: Sequence[str] = ("Table",),
+                   workers: Optional[int] = None, dry_run: bool = False) -> List[Section]:
+    reader = PdfReader(pdf_path)
+    sections = build_section_index(reader, exclude)
+    if dry_run:
+        for section in sections:
+            print(f"{section.start + 1:>6}-{section.end:<6} {reader.page_labels[section.start]:>8}  {section.title}")
+        return sections
+
+    os.makedirs(output_dir, exist_ok=True)
+    if workers == 1 or len(sections) < 2:
+        for section in sections:
+            print(write_section(section, output_dir, reader))
+        return sections
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_path,)) as pool:
+        for output_path in pool.map(write_section, sections, [output_dir] * len(sections)):
+            print(output_path)
+    return sections
+
 
 if __name__ == "__main__":
-    reader = PdfReader("./RFP.pdf")
-    bms = bookmark_dict(reader.outline, reader)
-    split_and_save(bms, reader)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split a PDF into one file per outline section")
+    parser.add_argument("pdf", nargs="?", default="./RFP.pdf", help="PDF to split")
+    parser.add_argument("--output-dir", default="./pdfs", help="Directory for the section PDFs")
+    parser.add_argument("--exclude", nargs="*", default=["Table"],
+                        help="Ignore bookmarks whose title contains any of these strings")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the section index without writing files")
+    args = parser.parse_args()
+
+    split_and_save(args.pdf, args.output_dir, args.exclude, args.workers, args.dry_run)